@@ -2,8 +2,9 @@
 Adaptive UI - Handles dynamic UI sizing based on screen resolution and terminal size
 """
 import os
-import time
+import signal
 import threading
+import weakref
 from typing import Dict, Tuple, Optional, Callable, Any
 
 class AdaptiveUI:
@@ -21,6 +22,29 @@ class AdaptiveUI:
         SIZE_LARGE: (120, 30)   # Large: 120 columns, 30 rows
     }
     
+    # Default minimum sizes for each panel
+    PANEL_MIN_SIZES = {
+        "editor": 10,       # Editor panel needs minimum 10 rows
+        "terminal": 6,      # Terminal needs minimum 6 rows
+        "insights": 5,      # AI Insights panel needs minimum 5 rows
+        "search": 3,        # Search panel needs minimum 3 rows
+        "tab_bar": 1,       # Tab bar is always 1 row
+        "status_bar": 1     # Status bar is always 1 row
+    }
+    
+    # Order in which panels receive space when there isn't enough for all of them
+    PANEL_PRIORITY = ("tab_bar", "status_bar", "editor", "terminal", "insights", "search")
+    
+    # Share of any extra space given to each panel
+    PANEL_PROPORTIONS = {
+        "editor": 0.6,      # Editor gets 60% of extra space
+        "terminal": 0.25,   # Terminal gets 25% of extra space
+        "insights": 0.1,    # Insights gets 10% of extra space
+        "search": 0.05,     # Search gets 5% of extra space
+        "tab_bar": 0,       # Tab bar is fixed
+        "status_bar": 0     # Status bar is fixed
+    }
+    
     def __init__(self, size_thresholds: Optional[Dict[str, Tuple[int, int]]] = None):
         """Initialize the adaptive UI manager
         
@@ -33,18 +57,33 @@ class AdaptiveUI:
         self.current_height = 24
         self.terminal_monitor_active = False
         self.terminal_monitor_thread = None
-        self.resize_callbacks = []
-        self.last_check_time = 0
-        self.resize_interval = 1.0  # Check terminal size every second
+        self.resize_callbacks = {}  # Maps each registered callback to its safe wrapper
+        self._safe_resize_callbacks = ()
+        self.resize_interval = 0.5  # Polling interval when SIGWINCH is unavailable
+        self.signal_fallback_interval = 2.0  # Safety-net check when SIGWINCH is used
+        self._resize_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._previous_sigwinch_handler = None
+        self._sigwinch_installed = False
     
     def start_terminal_monitor(self) -> None:
-        """Start monitoring terminal size changes in a background thread"""
+        """Start monitoring terminal size changes
+        
+        On POSIX systems the kernel reports resizes with SIGWINCH, so a worker
+        thread simply waits for the signal. Platforms without SIGWINCH (Windows)
+        fall back to polling the terminal size.
+        """
         if self.terminal_monitor_active:
             return
             
         self.terminal_monitor_active = True
+        self._stop_event.clear()
+        if self._install_sigwinch_handler():
+            target = self._wait_for_resize_signals
+        else:
+            target = self._monitor_terminal_size
         self.terminal_monitor_thread = threading.Thread(
-            target=self._monitor_terminal_size, 
+            target=target, 
             daemon=True
         )
         self.terminal_monitor_thread.start()
@@ -52,40 +91,104 @@ class AdaptiveUI:
     def stop_terminal_monitor(self) -> None:
         """Stop the terminal size monitoring thread"""
         self.terminal_monitor_active = False
+        self._stop_event.set()
+        self._restore_sigwinch_handler()
+        # Wake the signal worker so it notices the shutdown
+        self._resize_event.set()
         if self.terminal_monitor_thread and self.terminal_monitor_thread.is_alive():
             self.terminal_monitor_thread.join(timeout=1.0)
     
+    def _install_sigwinch_handler(self) -> bool:
+        """Install a SIGWINCH handler that wakes the resize worker
+        
+        Returns:
+            True if the handler was installed, False if polling is required
+        """
+        if not hasattr(signal, "SIGWINCH"):
+            return False
+        
+        # Hold only a weak reference so the handler doesn't keep us alive
+        ui_ref = weakref.ref(self)
+        previous_handler = signal.getsignal(signal.SIGWINCH)
+        
+        def handle_sigwinch(signum, frame):
+            # Keep the handler minimal: just wake the worker thread
+            ui = ui_ref()
+            if ui is not None:
+                ui._resize_event.set()
+            if callable(previous_handler):
+                previous_handler(signum, frame)
+        
+        try:
+            signal.signal(signal.SIGWINCH, handle_sigwinch)
+        except ValueError:
+            # Signal handlers can only be installed from the main thread
+            return False
+        
+        self._previous_sigwinch_handler = previous_handler
+        self._sigwinch_installed = True
+        return True
+    
+    def _restore_sigwinch_handler(self) -> None:
+        """Restore the SIGWINCH handler that was active before monitoring started"""
+        if not self._sigwinch_installed:
+            return
+        
+        try:
+            signal.signal(signal.SIGWINCH, self._previous_sigwinch_handler or signal.SIG_DFL)
+        except ValueError:
+            # Not on the main thread; leave the handler in place
+            return
+        self._previous_sigwinch_handler = None
+        self._sigwinch_installed = False
+    
+    def _wait_for_resize_signals(self) -> None:
+        """Handle resize notifications delivered by the SIGWINCH handler"""
+        while not self._stop_event.is_set():
+            # The timeout is only a safety net for when another component
+            # (e.g. the prompt_toolkit event loop) takes over SIGWINCH
+            self._resize_event.wait(self.signal_fallback_interval)
+            self._resize_event.clear()
+            if self._stop_event.is_set():
+                break
+            
+            try:
+                self._handle_resize()
+            except Exception as e:
+                # Log the error but don't crash the thread
+                print(f"Error monitoring terminal size: {e}")
+    
     def _monitor_terminal_size(self) -> None:
-        """Monitor terminal size in a background thread"""
-        while self.terminal_monitor_active:
+        """Monitor terminal size by polling in a background thread"""
+        while not self._stop_event.is_set():
             try:
-                # Check if enough time has passed since last check
-                current_time = time.time()
-                if current_time - self.last_check_time >= self.resize_interval:
-                    self.last_check_time = current_time
-                    
-                    # Get current terminal size
-                    width, height = self.get_terminal_size()
-                    
-                    # If size has changed, trigger resize event
-                    if width != self.current_width or height != self.current_height:
-                        old_category = self.current_size_category
-                        self.current_width = width
-                        self.current_height = height
-                        self.current_size_category = self._determine_size_category(width, height)
-                        
-                        # Notify callbacks of resize
-                        self._trigger_resize_callbacks(
-                            width, height, 
-                            self.current_size_category, 
-                            old_category != self.current_size_category
-                        )
+                self._handle_resize()
             except Exception as e:
                 # Log the error but don't crash the thread
                 print(f"Error monitoring terminal size: {e}")
                 
-            # Sleep to avoid consuming too much CPU
-            time.sleep(0.2)
+            # Wait between checks; returns early when the monitor is stopped
+            if self._stop_event.wait(self.resize_interval):
+                break
+    
+    def _handle_resize(self) -> None:
+        """Check the terminal size and notify callbacks if it has changed"""
+        # Get current terminal size
+        width, height = self.get_terminal_size()
+        
+        # If size has changed, trigger resize event
+        if width != self.current_width or height != self.current_height:
+            old_category = self.current_size_category
+            self.current_width = width
+            self.current_height = height
+            self.current_size_category = self._determine_size_category(width, height)
+            
+            # Notify callbacks of resize
+            self._trigger_resize_callbacks(
+                width, height, 
+                self.current_size_category, 
+                old_category != self.current_size_category
+            )
     
     def get_terminal_size(self) -> Tuple[int, int]:
         """Get current terminal dimensions
@@ -125,7 +228,8 @@ class AdaptiveUI:
             callback: Function that receives width, height, size_category, and category_changed parameters
         """
         if callback not in self.resize_callbacks:
-            self.resize_callbacks.append(callback)
+            self.resize_callbacks[callback] = self._wrap_resize_callback(callback)
+            self._safe_resize_callbacks = tuple(self.resize_callbacks.values())
     
     def unregister_resize_callback(self, callback: Callable) -> None:
         """Remove a previously registered callback
@@ -134,7 +238,25 @@ class AdaptiveUI:
             callback: The callback function to remove
         """
         if callback in self.resize_callbacks:
-            self.resize_callbacks.remove(callback)
+            del self.resize_callbacks[callback]
+            self._safe_resize_callbacks = tuple(self.resize_callbacks.values())
+    
+    @staticmethod
+    def _wrap_resize_callback(callback: Callable) -> Callable:
+        """Wrap a resize callback so its errors are logged instead of propagated
+        
+        Args:
+            callback: The callback function to wrap
+            
+        Returns:
+            Wrapper that calls the callback and reports any exception
+        """
+        def safe_callback(width, height, category, category_changed):
+            try:
+                callback(width, height, category, category_changed)
+            except Exception as e:
+                print(f"Error in resize callback: {e}")
+        return safe_callback
     
     def _trigger_resize_callbacks(self, width: int, height: int, category: str, category_changed: bool) -> None:
         """Call all registered callbacks with the new size information
@@ -145,11 +267,9 @@ class AdaptiveUI:
             category: Size category (small, medium, large)
             category_changed: Whether the size category has changed
         """
-        for callback in self.resize_callbacks:
-            try:
-                callback(width, height, category, category_changed)
-            except Exception as e:
-                print(f"Error in resize callback: {e}")
+        # Callbacks are pre-wrapped with error handling at registration time
+        for callback in self._safe_resize_callbacks:
+            callback(width, height, category, category_changed)
     
     def get_panel_sizes(self, 
                       available_height: int, 
@@ -163,29 +283,19 @@ class AdaptiveUI:
         Returns:
             Dictionary mapping panel names to their allocated heights
         """
-        # Default minimum sizes for each panel
-        min_sizes = {
-            "editor": 10,       # Editor panel needs minimum 10 rows
-            "terminal": 6,      # Terminal needs minimum 6 rows
-            "insights": 5,      # AI Insights panel needs minimum 5 rows
-            "search": 3,        # Search panel needs minimum 3 rows
-            "tab_bar": 1,       # Tab bar is always 1 row
-            "status_bar": 1     # Status bar is always 1 row
-        }
-        
-        # Calculate how many panels are enabled
-        enabled_panels = [panel for panel, enabled in panels.items() if enabled]
-        required_height = sum(min_sizes[panel] for panel in enabled_panels)
+        min_sizes = self.PANEL_MIN_SIZES
+        
+        # Calculate the space needed by the enabled panels
+        required_height = sum(min_sizes[panel] for panel, enabled in panels.items() if enabled)
         
         # If not enough space, prioritize panels
         if required_height > available_height:
             # Priority order: editor > terminal > tab_bar > status_bar > insights > search
-            priority_order = ["tab_bar", "status_bar", "editor", "terminal", "insights", "search"]
             result = {panel: 0 for panel in panels}
             
             remaining_height = available_height
-            for panel in priority_order:
-                if panel in enabled_panels and remaining_height > 0:
+            for panel in self.PANEL_PRIORITY:
+                if panels.get(panel) and remaining_height > 0:
                     # Allocate minimum size or remaining height, whichever is smaller
                     allocation = min(min_sizes[panel], remaining_height)
                     result[panel] = allocation
@@ -195,25 +305,13 @@ class AdaptiveUI:
         
         # If enough space, distribute proportionally
         extra_height = available_height - required_height
-        proportions = {
-            "editor": 0.6,      # Editor gets 60% of extra space
-            "terminal": 0.25,   # Terminal gets 25% of extra space
-            "insights": 0.1,    # Insights gets 10% of extra space
-            "search": 0.05,     # Search gets 5% of extra space
-            "tab_bar": 0,       # Tab bar is fixed
-            "status_bar": 0     # Status bar is fixed
-        }
+        proportions = self.PANEL_PROPORTIONS
         
         result = {}
-        for panel in panels:
-            if panels[panel]:  # If panel is enabled
-                # Start with minimum size
-                panel_height = min_sizes[panel]
-                
-                # Add proportion of extra space
-                panel_height += int(extra_height * proportions[panel])
-                
-                result[panel] = panel_height
+        for panel, enabled in panels.items():
+            if enabled:
+                # Start with minimum size and add proportion of extra space
+                result[panel] = min_sizes[panel] + int(extra_height * proportions[panel])
             else:
                 result[panel] = 0
         
@@ -2,41 +2,144 @@
 AI Context - Provides AI-powered code analysis and contextual insights
 """
 
+import functools
+import itertools
+import queue
 import re
 import sys
 import threading
-import time
-from collections import deque
+from collections import Counter, OrderedDict
+
+# Precompiled patterns used by the context classifier and insight generators
+# Each alternative scans the whole line before the next one is tried, so the
+# order below (def, class, loop, conditional, import) still decides ties
+_RE_CONTEXT_TYPE = re.compile(
+    r'.*?(?P<function_definition>def\s+\w+\s*\()'
+    r'|.*?(?P<class_definition>class\s+\w+)'
+    r'|.*?(?P<loop_construct>for\s+\w+\s+in\s+|while\s+)'
+    r'|.*?(?P<conditional>(?:if|elif)\s+|else\s*:)'
+    r'|.*?(?P<import_statement>import\s+|from\s+\w+\s+import)'
+)
+_RE_ASSIGN_OP = re.compile(r'==|!=|<=|>=|\+=|-=|\*=|/=')
+_RE_COMPLEXITY_KEYWORDS = re.compile(r'\b(if|elif|else|for|while|return)\b')
+_RE_SERVICE_NAME = re.compile(r'Manager|Controller|Service')
+_RE_INIT_DEF = re.compile(r'def __init__')
+_RE_ANY_DEF = re.compile(r'def \w+')
+_RE_SUBCLASS = re.compile(r'class \w+\((\w+)\):')
+_RE_NESTED_FOR = re.compile(r'for.*\n.*for')
+_RE_APPEND_LOOP = re.compile(r'for\s+\w+\s+in\s+\w+:.*append')
+_RE_RANGE_APPEND_LOOP = re.compile(r'for.*in range.*:.*\.append')
+_RE_BOOL_COMPARISON = re.compile(r'if\s+\w+\s*==\s*(?:True|False)')
+_RE_COMPLEX_CONDITION = re.compile(r'if.*and.*and.*and|if.*or.*or.*or')
+_RE_WILDCARD_IMPORT = re.compile(r'from\s+\w+\s+import\s+\*')
+_RE_MANY_IMPORTS = re.compile(r'from\s+\w+\s+import\s+\w+,\s+\w+,\s+\w+,\s+\w+')
+_RE_ALIASED_IMPORT = re.compile(r'import\s+\w+\s+as\s+\w+')
+_RE_ASSIGN_TARGET = re.compile(r'(\w+)\s*=')
+_RE_CONVENTIONAL_NAME = re.compile(r'^(?:[a-z][a-z0-9_]*|[A-Z][A-Z0-9_]*)$')
+_RE_FUNCTION_SIGNATURE = re.compile(r'def\s+(\w+)\s*\((.*?)\):', re.DOTALL)
+_RE_CLASS_SIGNATURE = re.compile(r'class\s+(\w+)(?:\s*\((.*?)\))?:', re.DOTALL)
+_RE_METHOD_DEF = re.compile(r'def\s+\w+\s*\(self')
+_RE_FOR_HEADER = re.compile(r'for\s+(\w+)\s+in\s+(.*?):')
+_RE_WHILE_HEADER = re.compile(r'while\s+(.*?):')
+_RE_IF_HEADER = re.compile(r'if\s+(.*?):')
+_RE_ELIF_HEADER = re.compile(r'elif\s+(.*?):')
+_RE_FROM_IMPORT_PARTS = re.compile(r'from\s+([\w.]+)\s+import\s+(.*)')
+_RE_IMPORT_PARTS = re.compile(r'import\s+(.*)')
+_RE_ASSIGNMENT = re.compile(r'(\w+)\s*=\s*(.*)')
+_RE_FUNCTION_CALL = re.compile(r'\w+\s*\(')
 
 # Cache for storing insights to avoid regenerating the same content
-insights_cache = {}
-# Queue for storing analysis requests
-analysis_queue = deque()
-# Flag to track if an analysis is currently running
-is_analyzing = False
-# Lock for thread safety
+# (least recently used entries are evicted once the cache is full)
+insights_cache = OrderedDict()
+INSIGHTS_CACHE_SIZE = 512
+# Lock protecting the insights cache, which both the editor and the worker thread use
+insights_cache_lock = threading.Lock()
+# Queue for storing analysis requests, consumed by a single worker thread
+analysis_queue = queue.Queue()
+# Lock protecting the published insight
 analysis_lock = threading.Lock()
+# Most recent (text, line_number, filename, sequence) passed to request_analysis
+_last_request = None
+# Numbers requests in the order they were made, so an insight is only
+# published if no newer request's insight has been published already
+_request_sequence = itertools.count(1)
+_published_sequence = 0
+# Buffers shorter than this are analysed synchronously in request_analysis
+SYNC_ANALYSIS_LIMIT = 4096
+
+# Most recent (text, line_number, context) computed by get_code_context
+_last_code_context = None
+
+# Size of the blocks skipped with str.count when locating a line in a large buffer
+LINE_SCAN_CHUNK = 65536
+
+def _find_line_start(text, line_number):
+    """Return the offset where the given line starts, or -1 if there is no such line"""
+    pos = 0
+    remaining = line_number
+    
+    # Skip whole chunks that end before the target line
+    text_length = len(text)
+    while remaining and pos + LINE_SCAN_CHUNK < text_length:
+        newlines = text.count('\n', pos, pos + LINE_SCAN_CHUNK)
+        if newlines >= remaining:
+            break
+        remaining -= newlines
+        pos += LINE_SCAN_CHUNK
+    
+    # Walk the remaining lines one newline at a time
+    for _ in range(remaining):
+        pos = text.find('\n', pos) + 1
+        if not pos:
+            return -1
+    return pos
+
+def _slice_lines(text, first_line, count):
+    """Return up to `count` lines starting at `first_line` without splitting the whole text"""
+    start = _find_line_start(text, first_line)
+    if start == -1:
+        return []
+    
+    end = start
+    for _ in range(count):
+        end = text.find('\n', end) + 1
+        if not end:
+            return text[start:].split('\n')
+    return text[start:end - 1].split('\n')
 
 def get_code_context(text, line_number):
     """Extract relevant context from the code around the current line"""
-    lines = text.split('\n')
-    if not lines or line_number >= len(lines):
+    global _last_code_context
+    
+    # Reuse the previous result while the buffer and line are unchanged
+    cached = _last_code_context
+    if cached is not None and cached[1] == line_number and (cached[0] is text or cached[0] == text):
+        context = cached[2]
+    else:
+        context = _extract_code_context(text, line_number)
+        _last_code_context = (text, line_number, context)
+    
+    # Hand out a copy since callers annotate the context with a filename
+    return dict(context) if context else None
+
+def _extract_code_context(text, line_number):
+    """Build the context dictionary for the given line"""
+    # Determine the start and end of the context window
+    # Try to get 5 lines before and after for context
+    context_start = max(0, line_number - 5)
+    
+    # Extract only the context lines rather than splitting the whole buffer
+    context_lines = _slice_lines(text, context_start, line_number + 6 - context_start)
+    if line_number - context_start >= len(context_lines):
         return None
     
     # Get the current line
-    current_line = lines[line_number].strip()
+    current_line = context_lines[line_number - context_start].strip()
     
     # If the line is empty, there's no context to analyze
     if not current_line:
         return None
     
-    # Determine the start and end of the context window
-    # Try to get 5 lines before and after for context
-    context_start = max(0, line_number - 5)
-    context_end = min(len(lines), line_number + 6)
-    
-    # Extract the context lines
-    context_lines = lines[context_start:context_end]
     context_text = '\n'.join(context_lines)
     
     # Determine what kind of code context we're looking at
@@ -51,28 +154,28 @@ def get_code_context(text, line_number):
 
 def determine_context_type(current_line, context_text):
     """Try to determine what kind of code construct we're looking at"""
-    # Check for function/method definition
-    if re.search(r'def\s+\w+\s*\(', current_line):
+    # Only the current line decides the type, so results can be cached per line
+    return _classify_line(current_line)
+
+@functools.lru_cache(maxsize=1024)
+def _classify_line(current_line):
+    """Classify a single stripped line of code"""
+    # Most definitions and imports are recognisable from the line prefix alone
+    if current_line.startswith(('def ', 'async def ')) and '(' in current_line:
         return 'function_definition'
-    
-    # Check for class definition
-    if re.search(r'class\s+\w+', current_line):
+    if current_line.startswith('class '):
         return 'class_definition'
-    
-    # Check for loop construct
-    if re.search(r'for\s+\w+\s+in\s+', current_line) or re.search(r'while\s+', current_line):
-        return 'loop_construct'
-    
-    # Check for conditional
-    if re.search(r'if\s+', current_line) or re.search(r'elif\s+', current_line) or re.search(r'else\s*:', current_line):
-        return 'conditional'
-    
-    # Check for import statement
-    if re.search(r'import\s+', current_line) or re.search(r'from\s+\w+\s+import', current_line):
+    if current_line.startswith(('import ', 'from ')):
         return 'import_statement'
     
+    # Check for definitions, loops, conditionals and imports in one pass;
+    # the name of the matching group is the context type
+    match = _RE_CONTEXT_TYPE.match(current_line)
+    if match:
+        return match.lastgroup
+    
     # Check for variable assignment
-    if '=' in current_line and not re.search(r'==|!=|<=|>=|\+=|-=|\*=|/=', current_line):
+    if '=' in current_line and not _RE_ASSIGN_OP.search(current_line):
         return 'variable_assignment'
     
     # Default to general code
@@ -90,8 +193,11 @@ def generate_insight(context):
     
     # Add filename to context key if available to make insights more specific
     cache_key = f"{context_text}:{context_type}:{filename if filename else ''}"
-    if cache_key in insights_cache:
-        return insights_cache[cache_key]
+    with insights_cache_lock:
+        insight = insights_cache.get(cache_key)
+        if insight is not None:
+            insights_cache.move_to_end(cache_key)
+            return insight
     
     # Enhanced rule-based insights based on context type
     try:
@@ -138,21 +244,27 @@ def generate_insight(context):
         print(f"Error in enhanced insight generation: {str(e)}", file=sys.stderr)
         insight = f"Code analysis completed. {context_type.replace('_', ' ').title()} detected."
     
-    # Store in cache
-    insights_cache[cache_key] = insight
+    # Store in cache, evicting the least recently used entry if needed
+    with insights_cache_lock:
+        insights_cache[cache_key] = insight
+        if len(insights_cache) > INSIGHTS_CACHE_SIZE:
+            insights_cache.popitem(last=False)
     
     return insight
 
 def estimate_function_complexity(context_text):
     """Estimate function complexity and suggest improvements"""
+    # Tally branch, loop and return keywords in a single scan
+    counts = Counter(_RE_COMPLEXITY_KEYWORDS.findall(context_text))
+    
     # Count the number of branches (if/else statements)
-    branches = len(re.findall(r'\bif\b|\belif\b|\belse\b', context_text))
+    branches = counts['if'] + counts['elif'] + counts['else']
     
     # Count the number of loops
-    loops = len(re.findall(r'\bfor\b|\bwhile\b', context_text))
+    loops = counts['for'] + counts['while']
     
     # Count the number of returns
-    returns = len(re.findall(r'\breturn\b', context_text))
+    returns = counts['return']
     
     complexity = branches + loops
     
@@ -168,15 +280,15 @@ def estimate_function_complexity(context_text):
 def suggest_class_relationships(context_text):
     """Suggest potential class relationships or design patterns"""
     # Look for manager/controller type patterns
-    if re.search(r'Manager|Controller|Service', context_text):
+    if _RE_SERVICE_NAME.search(context_text):
         return "This appears to be a service/controller class. Consider dependency injection for better testability."
     
     # Look for data container patterns
-    if len(re.findall(r'def __init__', context_text)) == 1 and len(re.findall(r'def \w+', context_text)) <= 3:
+    if len(_RE_INIT_DEF.findall(context_text)) == 1 and len(_RE_ANY_DEF.findall(context_text)) <= 3:
         return "This looks like a data container class. Consider using dataclasses or attrs for cleaner implementation."
     
     # Look for inheritance
-    if re.search(r'class \w+\((\w+)\):', context_text):
+    if _RE_SUBCLASS.search(context_text):
         return "Uses inheritance. Ensure the class follows the Liskov Substitution Principle."
     
     return ""
@@ -184,15 +296,15 @@ def suggest_class_relationships(context_text):
 def suggest_loop_optimization(context_text):
     """Suggest loop optimizations"""
     # Check for nested loops which might be optimized
-    if re.search(r'for.*\n.*for', context_text):
+    if _RE_NESTED_FOR.search(context_text):
         return "Nested loops detected. Consider performance implications for large datasets."
     
     # Check for list comprehension opportunities
-    if re.search(r'for\s+\w+\s+in\s+\w+:.*append', context_text):
+    if _RE_APPEND_LOOP.search(context_text):
         return "Consider using a list comprehension for cleaner code and potentially better performance."
     
     # Check for inefficient operation in a loop
-    if re.search(r'for.*in range.*:.*\.append', context_text):
+    if _RE_RANGE_APPEND_LOOP.search(context_text):
         return "If possible, pre-allocate the list size rather than growing it with append."
     
     return ""
@@ -200,11 +312,11 @@ def suggest_loop_optimization(context_text):
 def suggest_conditional_simplification(context_text):
     """Suggest simplifications for conditionals"""
     # Check for potential truth value testing simplification
-    if re.search(r'if\s+\w+\s*==\s*True', context_text) or re.search(r'if\s+\w+\s*==\s*False', context_text):
+    if _RE_BOOL_COMPARISON.search(context_text):
         return "Consider simplifying boolean comparisons (use 'if var:' instead of 'if var == True:')."
     
     # Check for potentially complex conditionals
-    if re.search(r'if.*and.*and.*and|if.*or.*or.*or', context_text):
+    if _RE_COMPLEX_CONDITION.search(context_text):
         return "Complex condition detected. Consider breaking it down or extracting to a predicate function."
     
     return ""
@@ -212,15 +324,15 @@ def suggest_conditional_simplification(context_text):
 def suggest_import_best_practice(current_line):
     """Suggest import best practices"""
     # Check for wildcard imports
-    if re.search(r'from\s+\w+\s+import\s+\*', current_line):
+    if _RE_WILDCARD_IMPORT.search(current_line):
         return "Wildcard imports are generally discouraged as they can lead to namespace pollution."
     
     # Check for too many imports from one module
-    if re.search(r'from\s+\w+\s+import\s+\w+,\s+\w+,\s+\w+,\s+\w+', current_line):
+    if _RE_MANY_IMPORTS.search(current_line):
         return "Consider importing the module itself if using many of its components."
     
     # Check for aliased imports
-    if re.search(r'import\s+\w+\s+as\s+\w+', current_line):
+    if _RE_ALIASED_IMPORT.search(current_line):
         return "Using alias. Make sure the alias is clear and follows project conventions."
     
     return ""
@@ -228,7 +340,7 @@ def suggest_import_best_practice(current_line):
 def suggest_variable_naming(current_line):
     """Suggest variable naming improvements"""
     # Extract variable name from assignment
-    var_match = re.search(r'(\w+)\s*=', current_line)
+    var_match = _RE_ASSIGN_TARGET.search(current_line)
     if not var_match:
         return ""
     
@@ -239,7 +351,7 @@ def suggest_variable_naming(current_line):
         return "Consider using a more descriptive variable name."
     
     # Check for snake_case in Python
-    if not re.match(r'^[a-z][a-z0-9_]*$', var_name) and not re.match(r'^[A-Z][A-Z0-9_]*$', var_name):
+    if not _RE_CONVENTIONAL_NAME.match(var_name):
         return "Variable name doesn't follow snake_case (for variables) or UPPER_CASE (for constants) convention."
     
     # Check for very long variable names
@@ -251,7 +363,7 @@ def suggest_variable_naming(current_line):
 def generate_function_insight(context_text):
     """Generate insights for function definitions"""
     # Extract function name and parameters
-    match = re.search(r'def\s+(\w+)\s*\((.*?)\):', context_text, re.DOTALL)
+    match = _RE_FUNCTION_SIGNATURE.search(context_text)
     if not match:
         return "This appears to be a function definition."
     
@@ -266,9 +378,8 @@ def generate_function_insight(context_text):
     has_return = 'return ' in context_text
     return_note = " It has an explicit return statement." if has_return else " No explicit return statement found."
     
-    param_list = params.split(',')
-    if params and len(param_list) > 0:
-        param_count = len(param_list)
+    param_count = params.count(',') + 1 if params else 0
+    if param_count:
         param_note = f" It takes {param_count} parameter{'s' if param_count > 1 else ''}."
     else:
         param_note = " It doesn't take any parameters."
@@ -278,7 +389,7 @@ def generate_function_insight(context_text):
 def generate_class_insight(context_text):
     """Generate insights for class definitions"""
     # Extract class name and inheritance
-    match = re.search(r'class\s+(\w+)(?:\s*\((.*?)\))?:', context_text, re.DOTALL)
+    match = _RE_CLASS_SIGNATURE.search(context_text)
     if not match:
         return "This appears to be a class definition."
     
@@ -286,7 +397,7 @@ def generate_class_insight(context_text):
     inheritance = match.group(2).strip() if match.group(2) else None
     
     # Check for methods
-    method_count = len(re.findall(r'def\s+\w+\s*\(self', context_text))
+    method_count = len(_RE_METHOD_DEF.findall(context_text))
     method_note = f" It has {method_count} method{'s' if method_count != 1 else ''}." if method_count > 0 else " No methods defined yet."
     
     # Check for docstring
@@ -300,7 +411,7 @@ def generate_class_insight(context_text):
 def generate_loop_insight(context_text, current_line):
     """Generate insights for loop constructs"""
     if 'for ' in current_line:
-        match = re.search(r'for\s+(\w+)\s+in\s+(.*?):', current_line)
+        match = _RE_FOR_HEADER.search(current_line)
         if match:
             var_name = match.group(1)
             iterable = match.group(2).strip()
@@ -308,7 +419,7 @@ def generate_loop_insight(context_text, current_line):
         return "For loop construct."
     
     if 'while ' in current_line:
-        match = re.search(r'while\s+(.*?):', current_line)
+        match = _RE_WHILE_HEADER.search(current_line)
         if match:
             condition = match.group(1).strip()
             return f"While loop with condition: {condition}"
@@ -321,11 +432,11 @@ def generate_conditional_insight(context_text):
     conditions = []
     
     # Find all condition blocks
-    if_match = re.search(r'if\s+(.*?):', context_text)
+    if_match = _RE_IF_HEADER.search(context_text)
     if if_match:
         conditions.append(f"if {if_match.group(1).strip()}")
     
-    elif_matches = re.findall(r'elif\s+(.*?):', context_text)
+    elif_matches = _RE_ELIF_HEADER.findall(context_text)
     for match in elif_matches:
         conditions.append(f"elif {match.strip()}")
     
@@ -342,15 +453,15 @@ def generate_conditional_insight(context_text):
 
 def generate_import_insight(current_line):
     """Generate insights for import statements"""
-    if 'from ' in current_line and ' import ' in current_line:
-        match = re.search(r'from\s+([\w.]+)\s+import\s+(.*)', current_line)
+    if current_line.startswith('from ') and ' import ' in current_line:
+        match = _RE_FROM_IMPORT_PARTS.search(current_line)
         if match:
             module = match.group(1)
             imports = match.group(2).strip()
             return f"Importing {imports} from module {module}."
     
     if 'import ' in current_line:
-        match = re.search(r'import\s+(.*)', current_line)
+        match = _RE_IMPORT_PARTS.search(current_line)
         if match:
             imports = match.group(1).strip()
             if ' as ' in imports:
@@ -362,7 +473,7 @@ def generate_import_insight(current_line):
 
 def generate_variable_insight(current_line, context_text):
     """Generate insights for variable assignments"""
-    match = re.search(r'(\w+)\s*=\s*(.*)', current_line)
+    match = _RE_ASSIGNMENT.search(current_line)
     if not match:
         return "Variable assignment."
     
@@ -399,65 +510,93 @@ def generate_general_insight(context_text):
     has_comments = '#' in context_text
     comment_note = " Contains inline comments." if has_comments else ""
     
-    has_function_calls = re.search(r'\w+\s*\(', context_text) is not None
+    has_function_calls = _RE_FUNCTION_CALL.search(context_text) is not None
     call_note = " Contains function calls." if has_function_calls else ""
     
     return f"General code block with {line_count} lines.{comment_note}{call_note}"
 
 def request_analysis(text, line_number, filename=None):
     """Request code analysis for the given text and line"""
-    with analysis_lock:
-        # Add to queue
-        analysis_queue.append((text, line_number, filename))
-        
-        # Start analysis thread if not already running
-        global is_analyzing
-        if not is_analyzing:
-            is_analyzing = True
-            threading.Thread(target=process_analysis_queue, daemon=True).start()
-            
+    global _last_request
+    
+    # Nothing to do if this exact buffer and line were already requested
+    previous = _last_request
+    if (previous is not None and previous[0] is text
+            and previous[1] == line_number and previous[2] == filename):
+        return "Analysis requested..."
+    _last_request = (text, line_number, filename, next(_request_sequence))
+    
+    # Small buffers are analysed faster than a handoff to the worker thread
+    if len(text) < SYNC_ANALYSIS_LIMIT:
+        # Drop queued requests, they're outdated now. One the worker is
+        # already analysing is kept from publishing by its sequence number.
+        try:
+            while True:
+                analysis_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return analyze_code(*_last_request)
+        except Exception as e:
+            print(f"Error generating insight: {str(e)}", file=sys.stderr)
+            return None
+    
+    # The worker thread blocks on the queue, so queuing is all that's needed
+    analysis_queue.put(_last_request)
     return "Analysis requested..."
 
+def analyze_code(text, line_number, filename=None, sequence=None):
+    """Generate and publish the insight for the given text and line
+    
+    If a sequence number is given, the insight is not published when the
+    insight of a newer request already has been.
+    
+    Returns the insight, or None if there was nothing to analyze.
+    """
+    global latest_insight, _published_sequence
+    
+    context = get_code_context(text, line_number)
+    if not context:
+        return None
+    
+    # Append the filename to the context if available
+    if filename:
+        context['filename'] = filename
+        
+    # Generate the insight
+    insight = generate_insight(context)
+    
+    # Skip the locked write when this insight is already published and no
+    # newer one can have been replaced by it (the published sequence only grows)
+    if insight is latest_insight and sequence is not None and sequence <= _published_sequence:
+        return insight
+    
+    # Store in global variable that can be accessed by the editor
+    with analysis_lock:
+        if sequence is None or sequence > _published_sequence:
+            latest_insight = insight
+            if sequence is not None:
+                _published_sequence = sequence
+    return insight
+
 def process_analysis_queue():
     """Process the analysis queue in a background thread"""
-    global is_analyzing, latest_insight
-    
-    try:
-        while True:
-            # Check if there are items in the queue
-            with analysis_lock:
-                if not analysis_queue:
-                    is_analyzing = False
-                    break
-                
-                # Get the next item
-                text, line_number, filename = analysis_queue.popleft()
-            
-            # Generate the insight outside the lock to prevent blocking
-            try:
-                context = get_code_context(text, line_number)
-                if context:
-                    # Append the filename to the context if available
-                    if filename:
-                        context['filename'] = filename
-                        
-                    # Generate the insight
-                    insight = generate_insight(context)
-                    
-                    # Store in global variable that can be accessed by the editor
-                    # Using the lock to ensure thread-safe update
-                    with analysis_lock:
-                        latest_insight = insight
-                    
-                    # Simulate some processing time
-                    time.sleep(0.5)
-            except Exception as e:
-                # In case of error, log it and continue
-                print(f"Error generating insight: {str(e)}", file=sys.stderr)
-    finally:
-        # Ensure we reset the flag when done, even if an exception occurs
-        with analysis_lock:
-            is_analyzing = False
+    while True:
+        # Block until the next request arrives
+        request = analysis_queue.get()
+        
+        # Only the newest request matters; drop any that piled up meanwhile
+        try:
+            while True:
+                request = analysis_queue.get_nowait()
+        except queue.Empty:
+            pass
+        
+        try:
+            analyze_code(*request)
+        except Exception as e:
+            # In case of error, log it and continue
+            print(f"Error generating insight: {str(e)}", file=sys.stderr)
 
 # Initialize the latest insight
 latest_insight = None
@@ -465,4 +604,7 @@ latest_insight = None
 def get_latest_insight():
     """Get the latest generated insight in a thread-safe manner"""
     with analysis_lock:
-        return latest_insight
\ No newline at end of file
+        return latest_insight
+
+# Start the long-lived worker that consumes the analysis queue
+threading.Thread(target=process_analysis_queue, daemon=True).start()
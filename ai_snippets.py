@@ -3,20 +3,451 @@ AI Snippets - AI-powered code snippet generation and management
 """
 import os
 import re
-import json
 import time
+import atexit
+import bisect
+import functools
 import threading
 import logging
-from typing import Dict, List, Tuple, Optional, Any, Union, Set
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional, Any, Union, Set, Sequence
 
 from snippets import Snippet, get_snippet_manager
+from utils import json_from_bytes, json_to_bytes
+
+try:
+    # pyahocorasick is optional; it matches all snippet keywords in one pass
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns used when naming and describing snippets
+_RE_FUNCTION_NAME = re.compile(r'(?:function|def|async def)\s+(\w+)')
+_RE_CLASS_NAME = re.compile(r'class\s+(\w+)')
+_RE_COMMENT = re.compile(r'(?://|#|/\*|\*|"""|\'\'\')(.+)')
+_RE_NON_WORD = re.compile(r'[^\w]')
+
+# Translation table that deletes every ASCII character \w doesn't match
+_NON_WORD_ASCII = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if not (chr(c).isalnum() or chr(c) == '_')
+))
+
+def _strip_non_word(text: str) -> str:
+    r"""Remove every character that isn't a word character (like [^\w])"""
+    if text.isascii():
+        return text.translate(_NON_WORD_ASCII)
+    return _RE_NON_WORD.sub('', text)
+
+def _template(*lines) -> Tuple[Tuple[Any, ...], Optional[int], Optional[Tuple[str, str]]]:
+    """Build a snippet body template from its lines
+    
+    A (prefix, suffix) tuple in place of a line marks where the snippet
+    description is inserted.
+    
+    Returns:
+        Tuple of (lines, description line index, (prefix, suffix)); the index
+        and affixes are None when the template doesn't include the description
+    """
+    for index, line in enumerate(lines):
+        if not isinstance(line, str):
+            return lines[:index] + (None,) + lines[index + 1:], index, line
+    return lines, None, None
+
+# Snippet body templates used by the rule-based generator
+_PYTHON_FUNCTION_TEMPLATE = _template(
+    "def ${1:function_name}(${2:parameters}):",
+    ("    \"\"\"${3:", "}\"\"\""),
+    "    ${4:# Function implementation}",
+    "    ${5:pass}"
+)
+_PYTHON_CLASS_TEMPLATE = _template(
+    "class ${1:ClassName}:",
+    ("    \"\"\"${2:", "}\"\"\""),
+    "    def __init__(self, ${3:parameters}):",
+    "        ${4:# Initialize attributes}",
+    "        ${5:pass}",
+    "    ",
+    "    def ${6:method_name}(self, ${7:parameters}):",
+    "        ${8:# Method implementation}",
+    "        ${9:pass}"
+)
+_PYTHON_RANGE_LOOP_TEMPLATE = _template(
+    "for ${1:i} in range(${2:n}):",
+    "    ${3:# Loop body}",
+    "    ${4:pass}"
+)
+_PYTHON_LOOP_TEMPLATE = _template(
+    "for ${1:item} in ${2:iterable}:",
+    "    ${3:# Loop body}",
+    "    ${4:pass}"
+)
+_PYTHON_CONDITIONAL_TEMPLATE = _template(
+    "if ${1:condition}:",
+    "    ${2:# If block}",
+    "    ${3:pass}",
+    "elif ${4:other_condition}:",
+    "    ${5:# Elif block}",
+    "    ${6:pass}",
+    "else:",
+    "    ${7:# Else block}",
+    "    ${8:pass}"
+)
+_PYTHON_TRY_TEMPLATE = _template(
+    "try:",
+    "    ${1:# Code that might raise an exception}",
+    "    ${2:pass}",
+    "except ${3:Exception} as ${4:e}:",
+    "    ${5:# Handle the exception}",
+    "    ${6:pass}",
+    "finally:",
+    "    ${7:# Cleanup code (always executed)}",
+    "    ${8:pass}"
+)
+_PYTHON_IMPORT_TEMPLATE = _template(
+    "import ${1:module}",
+    "from ${2:package} import ${3:submodule}",
+    "",
+    "${4:# Use the imported modules}",
+    "${5:pass}"
+)
+_PYTHON_FILE_TEMPLATE = _template(
+    "with open(${1:file_path}, ${2:'r'}) as ${3:f}:",
+    "    ${4:content} = ${3:f}.read()",
+    "    ${5:# Process the file content}",
+    "    ${6:pass}"
+)
+_PYTHON_DEFAULT_TEMPLATE = _template(
+    ("# ${1:", "}"),
+    "${2:# Your code here}",
+    "${3:pass}"
+)
+
+_JAVASCRIPT_ARROW_FUNCTION_TEMPLATE = _template(
+    "const ${1:functionName} = (${2:parameters}) => {",
+    "  ${3:// Function implementation}",
+    "  ${4:return ${5:result};}",
+    "};"
+)
+_JAVASCRIPT_FUNCTION_TEMPLATE = _template(
+    "function ${1:functionName}(${2:parameters}) {",
+    "  ${3:// Function implementation}",
+    "  ${4:return ${5:result};}",
+    "}"
+)
+_JAVASCRIPT_CLASS_TEMPLATE = _template(
+    "class ${1:ClassName} {",
+    "  constructor(${2:parameters}) {",
+    "    ${3:// Initialize properties}",
+    "    ${4:this.property = value;}",
+    "  }",
+    "  ",
+    "  ${5:methodName}(${6:parameters}) {",
+    "    ${7:// Method implementation}",
+    "    ${8:return ${9:result};}",
+    "  }",
+    "}"
+)
+_JAVASCRIPT_FOREACH_TEMPLATE = _template(
+    "${1:array}.forEach((${2:item}, ${3:index}) => {",
+    "  ${4:// Loop body}",
+    "});"
+)
+_JAVASCRIPT_LOOP_TEMPLATE = _template(
+    "for (let ${1:i} = 0; ${1:i} < ${2:array}.length; ${1:i}++) {",
+    "  ${3:const} ${4:item} = ${2:array}[${1:i}];",
+    "  ${5:// Loop body}",
+    "}"
+)
+_JAVASCRIPT_CONDITIONAL_TEMPLATE = _template(
+    "if (${1:condition}) {",
+    "  ${2:// If block}",
+    "} else if (${3:otherCondition}) {",
+    "  ${4:// Else if block}",
+    "} else {",
+    "  ${5:// Else block}",
+    "}"
+)
+_JAVASCRIPT_TRY_TEMPLATE = _template(
+    "try {",
+    "  ${1:// Code that might throw an error}",
+    "} catch (${2:error}) {",
+    "  ${3:// Handle the error}",
+    "} finally {",
+    "  ${4:// Cleanup code (always executed)}",
+    "}"
+)
+_JAVASCRIPT_IMPORT_TEMPLATE = _template(
+    "import ${1:{ moduleName }} from '${2:module}';",
+    "",
+    "${3:// Use the imported module}",
+    "${4:// Your code here}"
+)
+_JAVASCRIPT_FILE_TEMPLATE = _template(
+    "const fs = require('fs');",
+    "",
+    "fs.readFile('${1:file_path}', '${2:utf8}', (${3:err}, ${4:data}) => {",
+    "  if (${3:err}) {",
+    "    console.error(${3:err});",
+    "    return;",
+    "  }",
+    "  ${5:// Process the file content}",
+    "});"
+)
+_JAVASCRIPT_DEFAULT_TEMPLATE = _template(
+    ("// ${1:", "}"),
+    "${2:// Your code here}"
+)
+
+_HTML_FORM_TEMPLATE = _template(
+    "<form action=\"${1:#}\" method=\"${2:post}\">",
+    "  <div class=\"${3:form-group}\">",
+    "    <label for=\"${4:input-id}\">${5:Label}</label>",
+    "    <input type=\"${6:text}\" id=\"${4:input-id}\" name=\"${7:input-name}\" class=\"${8:form-control}\">",
+    "  </div>",
+    "  <button type=\"submit\" class=\"${9:btn}\">${10:Submit}</button>",
+    "</form>"
+)
+_HTML_TABLE_TEMPLATE = _template(
+    "<table class=\"${1:table}\">",
+    "  <thead>",
+    "    <tr>",
+    "      <th>${2:Column 1}</th>",
+    "      <th>${3:Column 2}</th>",
+    "      <th>${4:Column 3}</th>",
+    "    </tr>",
+    "  </thead>",
+    "  <tbody>",
+    "    <tr>",
+    "      <td>${5:Data 1}</td>",
+    "      <td>${6:Data 2}</td>",
+    "      <td>${7:Data 3}</td>",
+    "    </tr>",
+    "  </tbody>",
+    "</table>"
+)
+_HTML_UNORDERED_LIST_TEMPLATE = _template(
+    "<ul class=\"${1:list}\">",
+    "  <li>${2:Item 1}</li>",
+    "  <li>${3:Item 2}</li>",
+    "  <li>${4:Item 3}</li>",
+    "</ul>"
+)
+_HTML_ORDERED_LIST_TEMPLATE = _template(
+    "<ol class=\"${1:list}\">",
+    "  <li>${2:Item 1}</li>",
+    "  <li>${3:Item 2}</li>",
+    "  <li>${4:Item 3}</li>",
+    "</ol>"
+)
+_HTML_CONTAINER_TEMPLATE = _template(
+    "<div class=\"${1:container}\">",
+    "  <div class=\"${2:row}\">",
+    "    <div class=\"${3:col}\">",
+    "      ${4:<!-- Content here -->}",
+    "    </div>",
+    "  </div>",
+    "</div>"
+)
+_HTML_NAV_TEMPLATE = _template(
+    "<nav class=\"${1:navbar}\">",
+    "  <ul class=\"${2:nav-list}\">",
+    "    <li class=\"${3:nav-item}\"><a href=\"${4:#}\">${5:Home}</a></li>",
+    "    <li class=\"${3:nav-item}\"><a href=\"${6:#}\">${7:About}</a></li>",
+    "    <li class=\"${3:nav-item}\"><a href=\"${8:#}\">${9:Contact}</a></li>",
+    "  </ul>",
+    "</nav>"
+)
+_HTML_DEFAULT_TEMPLATE = _template(
+    ("<!-- ${1:", "} -->"),
+    "<div class=\"${2:container}\">",
+    "  ${3:<!-- Your content here -->}",
+    "</div>"
+)
+
+_CSS_FLEX_TEMPLATE = _template(
+    ".${1:container} {",
+    "  display: flex;",
+    "  flex-direction: ${2:row};",
+    "  justify-content: ${3:space-between};",
+    "  align-items: ${4:center};",
+    "  ${5:/* Additional flex properties */}",
+    "}"
+)
+_CSS_GRID_TEMPLATE = _template(
+    ".${1:container} {",
+    "  display: grid;",
+    "  grid-template-columns: ${2:repeat(3, 1fr)};",
+    "  grid-gap: ${3:10px};",
+    "  ${4:/* Additional grid properties */}",
+    "}"
+)
+_CSS_ANIMATION_TEMPLATE = _template(
+    "@keyframes ${1:animation-name} {",
+    "  0% {",
+    "    ${2:opacity: 0;}",
+    "  }",
+    "  100% {",
+    "    ${3:opacity: 1;}",
+    "  }",
+    "}",
+    "",
+    ".${4:element} {",
+    "  animation: ${1:animation-name} ${5:1s} ${6:ease-in-out};",
+    "}"
+)
+_CSS_MEDIA_TEMPLATE = _template(
+    "@media (${1:max-width: 768px}) {",
+    "  .${2:element} {",
+    "    ${3:/* Responsive styles */}",
+    "    ${4:width: 100%;}",
+    "  }",
+    "}"
+)
+_CSS_DEFAULT_TEMPLATE = _template(
+    ".${1:selector} {",
+    "  ${2:property}: ${3:value};",
+    "  ${4:/* Additional styles */}",
+    "}"
+)
+
+_GENERIC_DEFAULT_TEMPLATE = _template(
+    ("// ${1:", "}"),
+    "${2:// Insert your code here}"
+)
+
+# Per-language dispatch rules, checked in order. A rule applies when the
+# description mentions any of its keywords and, if a qualifier is given,
+# the qualifier as well. The final entry is the language's default template.
+_SNIPPET_RULES = {
+    'python': (
+        (('function', 'def'), None, _PYTHON_FUNCTION_TEMPLATE),
+        (('class',), None, _PYTHON_CLASS_TEMPLATE),
+        (('loop', 'for'), 'range', _PYTHON_RANGE_LOOP_TEMPLATE),
+        (('loop', 'for'), None, _PYTHON_LOOP_TEMPLATE),
+        (('if', 'condition'), None, _PYTHON_CONDITIONAL_TEMPLATE),
+        (('try', 'except', 'error'), None, _PYTHON_TRY_TEMPLATE),
+        (('import',), None, _PYTHON_IMPORT_TEMPLATE),
+        (('file', 'open', 'read'), None, _PYTHON_FILE_TEMPLATE),
+        ((), None, _PYTHON_DEFAULT_TEMPLATE),
+    ),
+    'javascript': (
+        (('function',), 'arrow', _JAVASCRIPT_ARROW_FUNCTION_TEMPLATE),
+        (('function',), None, _JAVASCRIPT_FUNCTION_TEMPLATE),
+        (('class',), None, _JAVASCRIPT_CLASS_TEMPLATE),
+        (('loop', 'for'), 'each', _JAVASCRIPT_FOREACH_TEMPLATE),
+        (('loop', 'for'), None, _JAVASCRIPT_LOOP_TEMPLATE),
+        (('if', 'condition'), None, _JAVASCRIPT_CONDITIONAL_TEMPLATE),
+        (('try', 'catch', 'error'), None, _JAVASCRIPT_TRY_TEMPLATE),
+        (('import',), None, _JAVASCRIPT_IMPORT_TEMPLATE),
+        (('file', 'read'), None, _JAVASCRIPT_FILE_TEMPLATE),
+        ((), None, _JAVASCRIPT_DEFAULT_TEMPLATE),
+    ),
+    'html': (
+        (('form',), None, _HTML_FORM_TEMPLATE),
+        (('table',), None, _HTML_TABLE_TEMPLATE),
+        (('list',), 'unordered', _HTML_UNORDERED_LIST_TEMPLATE),
+        (('list',), None, _HTML_ORDERED_LIST_TEMPLATE),
+        (('div', 'container'), None, _HTML_CONTAINER_TEMPLATE),
+        (('nav', 'menu'), None, _HTML_NAV_TEMPLATE),
+        ((), None, _HTML_DEFAULT_TEMPLATE),
+    ),
+    'css': (
+        (('flex',), None, _CSS_FLEX_TEMPLATE),
+        (('grid',), None, _CSS_GRID_TEMPLATE),
+        (('animation',), None, _CSS_ANIMATION_TEMPLATE),
+        (('media', 'responsive'), None, _CSS_MEDIA_TEMPLATE),
+        ((), None, _CSS_DEFAULT_TEMPLATE),
+    ),
+}
+_SNIPPET_RULES['js'] = _SNIPPET_RULES['javascript']
+
+def _rule_keywords(rules) -> Set[str]:
+    """Collect every keyword and qualifier used by a set of dispatch rules"""
+    keywords = set()
+    for rule_keywords, qualifier, _ in rules:
+        keywords.update(rule_keywords)
+        if qualifier:
+            keywords.add(qualifier)
+    return keywords
+
+def _compile_keyword_pattern(rules) -> "re.Pattern":
+    """Build a pattern that finds every rule keyword occurring in a description
+    
+    The lookahead lets overlapping keywords match, so keywords are found
+    anywhere in the text just like a substring test would (as long as no
+    keyword of a language is a prefix of another one).
+    """
+    keywords = _rule_keywords(rules)
+    alternation = '|'.join(sorted(map(re.escape, keywords), key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))')
+
+# Keywords each language's rules look for
+_SNIPPET_LANGUAGE_KEYWORDS = {
+    language: frozenset(_rule_keywords(rules))
+    for language, rules in _SNIPPET_RULES.items()
+}
+
+_SNIPPET_KEYWORD_PATTERNS = {
+    language: _compile_keyword_pattern(rules)
+    for language, rules in _SNIPPET_RULES.items()
+}
+
+def _build_keyword_automaton():
+    """Build an Aho-Corasick automaton over the keywords of all languages
+    
+    Returns:
+        The automaton, or None if pyahocorasick isn't installed
+    """
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for rules in _SNIPPET_RULES.values():
+        for keyword in _rule_keywords(rules):
+            automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+@functools.lru_cache(maxsize=256)
+def _select_template(language: str, found: frozenset) -> Tuple[Tuple[Any, ...], Optional[int], Optional[Tuple[str, str]]]:
+    """Pick the template of the first rule matched by a set of keywords
+    
+    Descriptions only ever hit a small number of distinct keyword sets, so
+    the rule walk is cached per set.
+    
+    Args:
+        language: Language with an entry in _SNIPPET_RULES
+        found: Keywords that occur in the description
+        
+    Returns:
+        The template of the first matching rule
+    """
+    for keywords, qualifier, template in _SNIPPET_RULES[language]:
+        if not keywords or (not found.isdisjoint(keywords)
+                            and (qualifier is None or qualifier in found)):
+            break
+    return template
+
+# Single-pass matcher for all snippet keywords (falls back to the per-language
+# patterns above when pyahocorasick isn't available)
+_SNIPPET_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
 class AISnippetGenerator:
     """Generates and manages AI-powered code snippets"""
     
+    # Number of generated snippets kept in the recent generations cache
+    MAX_RECENT_GENERATIONS = 50
+    
+    # Seconds to wait for more changes before writing snippets to disk
+    SAVE_DELAY = 0.5
+    
+    # Upper bound on threads used to read snippet files at startup
+    MAX_LOAD_WORKERS = 8
+    
     def __init__(self, snippets_dir: Optional[str] = None):
         """Initialize the AI snippet generator
         
@@ -30,48 +461,101 @@ class AISnippetGenerator:
         if not os.path.exists(self.snippets_dir):
             os.makedirs(self.snippets_dir)
         
-        # Dictionary to store AI-generated snippets
-        self.ai_snippets: Dict[str, List[Snippet]] = {}
+        # AI-generated snippets per language, keyed by snippet name
+        self.ai_snippets: Dict[str, Dict[str, Snippet]] = {}
+        
+        # Per-language (prefix, name, snippet) entries sorted by prefix, so
+        # prefix lookups can use binary search instead of a full scan
+        self._prefix_index: Dict[str, List[Tuple[str, str, Snippet]]] = {}
+        
+        # Per-language locks for thread safety when changing snippets, so
+        # writers for different languages don't contend with each other
+        self._language_locks: Dict[str, threading.Lock] = {}
+        self._language_locks_guard = threading.Lock()
         
         # Load existing AI snippets
         self._load_ai_snippets()
         
         # Cache of recently generated snippets to avoid duplicates
-        self.recent_generations: Dict[str, Dict[str, Any]] = {}
+        # (ordered from least to most recently used)
+        self.recent_generations: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         
-        # Lock for thread safety when adding snippets
-        self.snippet_lock = threading.Lock()
+        # Languages with changes that haven't been written to disk yet.
+        # A background writer coalesces them so bulk edits don't rewrite
+        # the same file once per mutation. It only runs while changes are
+        # pending, so idle instances don't keep a thread around.
+        self._dirty_languages: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._save_thread: Optional[threading.Thread] = None
     
     def _load_ai_snippets(self) -> None:
         """Load AI-generated snippets from disk"""
         try:
             # Clear existing snippets
             self.ai_snippets = {}
+            self._prefix_index = {}
+            
+            # Collect all JSON files in the snippets directory
+            languages = []
+            try:
+                with os.scandir(self.snippets_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.json') and entry.is_file():
+                            languages.append((entry.name[:-len('.json')], entry.path))
+            except FileNotFoundError:
+                pass
+            
+            # Files are independent, so read several of them concurrently
+            if len(languages) > 1:
+                max_workers = min(self.MAX_LOAD_WORKERS, len(languages))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    loaded = list(executor.map(lambda item: self._load_snippet_file(*item), languages))
+            else:
+                loaded = [self._load_snippet_file(*item) for item in languages]
             
-            # Load all JSON files in the snippets directory
-            if os.path.exists(self.snippets_dir):
-                for filename in os.listdir(self.snippets_dir):
-                    if filename.endswith('.json'):
-                        language = os.path.splitext(filename)[0]
-                        self.ai_snippets[language] = []
-                        
-                        try:
-                            with open(os.path.join(self.snippets_dir, filename), 'r') as f:
-                                snippet_data = json.load(f)
-                                
-                                # Process each snippet
-                                for name, data in snippet_data.items():
-                                    if isinstance(data, dict) and 'prefix' in data and 'body' in data:
-                                        prefix = data['prefix']
-                                        body = data['body'] if isinstance(data['body'], list) else [data['body']]
-                                        description = data.get('description', 'AI-generated snippet')
-                                        
-                                        snippet = Snippet(name, prefix, body, description, language)
-                                        self.ai_snippets[language].append(snippet)
-                        except (json.JSONDecodeError, IOError) as e:
-                            logger.error(f"Error loading AI snippets from {filename}: {e}")
+            for (language, _), snippets in zip(languages, loaded):
+                self.ai_snippets[language] = snippets
         except Exception as e:
             logger.error(f"Error loading AI snippets: {e}")
+        
+        # Build the prefix index for everything that was loaded
+        for language, snippets in self.ai_snippets.items():
+            self._prefix_index[language] = sorted(
+                (snippet.prefix, name, snippet) for name, snippet in snippets.items()
+            )
+    
+    def _load_snippet_file(self, language: str, file_path: str) -> Dict[str, Snippet]:
+        """Load the AI-generated snippets stored in one language file
+        
+        Args:
+            language: Language identifier
+            file_path: Path of the language's JSON file
+            
+        Returns:
+            Dictionary mapping snippet names to Snippet objects
+        """
+        snippets = {}
+        try:
+            with open(file_path, 'rb') as f:
+                snippet_data = json_from_bytes(f.read())
+            if not isinstance(snippet_data, dict):
+                logger.error(f"Error loading AI snippets from {os.path.basename(file_path)}: "
+                             f"expected an object of snippets")
+                return snippets
+                
+            # Process each snippet
+            for name, data in snippet_data.items():
+                if isinstance(data, dict) and isinstance(data.get('prefix'), str) and 'body' in data:
+                    prefix = data['prefix']
+                    body = data['body'] if isinstance(data['body'], list) else [data['body']]
+                    description = data.get('description', 'AI-generated snippet')
+                    
+                    snippets[name] = Snippet(name, prefix, body, description, language)
+        except Exception as e:
+            # A bad file only drops its own snippets
+            logger.error(f"Error loading AI snippets from {os.path.basename(file_path)}: {e}")
+        return snippets
     
     def _save_ai_snippets(self, language: str) -> None:
         """Save AI-generated snippets to disk for a specific language
@@ -79,29 +563,105 @@ class AISnippetGenerator:
         Args:
             language: Language identifier
         """
+        snapshot = self._snapshot_language(language)
+        # Skip if no snippets for this language
+        if snapshot:
+            self._write_snapshot(language, snapshot)
+    
+    def _snapshot_language(self, language: str) -> List[Snippet]:
+        """Copy the current snippets of a language
+        
+        Only this copy is taken under the language lock; serializing and
+        writing the snapshot happen without holding it.
+        
+        Args:
+            language: Language identifier
+            
+        Returns:
+            List of the language's Snippet objects
+        """
+        with self._language_lock(language):
+            return list(self.ai_snippets.get(language, {}).values())
+    
+    def _write_snapshot(self, language: str, snapshot: List[Snippet]) -> None:
+        """Write a snapshot of a language's snippets to disk
+        
+        Args:
+            language: Language identifier
+            snapshot: Snippets returned by _snapshot_language
+        """
         try:
-            # Skip if no snippets for this language
-            if language not in self.ai_snippets or not self.ai_snippets[language]:
-                return
-                
             # Create snippets dictionary
             snippets_dict = {}
-            for snippet in self.ai_snippets[language]:
+            for snippet in snapshot:
                 snippets_dict[snippet.name] = {
                     'prefix': snippet.prefix,
                     'body': snippet.body,
                     'description': snippet.description
                 }
             
-            # Save to file
+            # Write to a temporary file and swap it in, so a crash mid-write
+            # never leaves a truncated snippets file behind
+            data = json_to_bytes(snippets_dict)
             file_path = os.path.join(self.snippets_dir, f"{language}.json")
-            with open(file_path, 'w') as f:
-                json.dump(snippets_dict, f, indent=2)
+            temp_path = file_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, file_path)
                 
             logger.debug(f"Saved {len(snippets_dict)} AI snippets for {language}")
         except Exception as e:
             logger.error(f"Error saving AI snippets for {language}: {e}")
     
+    def _language_lock(self, language: str) -> threading.Lock:
+        """Get the lock guarding the snippets of a language
+        
+        Args:
+            language: Language identifier
+            
+        Returns:
+            Lock for the language, created on first use
+        """
+        lock = self._language_locks.get(language)
+        if lock is None:
+            with self._language_locks_guard:
+                lock = self._language_locks.setdefault(language, threading.Lock())
+        return lock
+    
+    def _mark_dirty(self, language: str) -> None:
+        """Schedule the snippets of a language to be saved
+        
+        Args:
+            language: Language identifier
+        """
+        with self._dirty_lock:
+            self._dirty_languages.add(language)
+            if self._save_thread is None:
+                self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+                self._save_thread.start()
+    
+    def _save_worker(self) -> None:
+        """Write dirty languages to disk in the background until none are left"""
+        while True:
+            # Give further changes a moment to accumulate into the same write
+            time.sleep(self.SAVE_DELAY)
+            self.flush()
+            
+            with self._dirty_lock:
+                if not self._dirty_languages:
+                    self._save_thread = None
+                    return
+    
+    def flush(self) -> None:
+        """Write all pending snippet changes to disk"""
+        with self._flush_lock:
+            with self._dirty_lock:
+                languages = self._dirty_languages
+                self._dirty_languages = set()
+            
+            for language in languages:
+                self._save_ai_snippets(language)
+    
     def generate_snippet_from_description(self, 
                                         language: str, 
                                         name: str, 
@@ -119,9 +679,11 @@ class AISnippetGenerator:
             Generated Snippet object or None if generation failed
         """
         # Check if we've recently generated a similar snippet
-        cache_key = f"{language}:{description.lower()}"
+        description_lower = description.lower()
+        cache_key = f"{language}:{description_lower}"
         if cache_key in self.recent_generations:
             logger.debug(f"Using cached snippet for: {description}")
+            self.recent_generations.move_to_end(cache_key)
             cached = self.recent_generations[cache_key]
             return Snippet(
                 name, 
@@ -136,7 +698,7 @@ class AISnippetGenerator:
             # Generate code snippet using rule-based templates with NLP-inspired
             # pattern matching for now - this can be replaced with an actual
             # AI code generation API in production
-            snippet_body = self._generate_snippet_body(language, description)
+            snippet_body = self._generate_snippet_body(language, description, description_lower)
             
             if not snippet_body:
                 logger.warning(f"Failed to generate snippet for: {description}")
@@ -148,7 +710,7 @@ class AISnippetGenerator:
                 prefix = name.lower().replace(' ', '_')
                 
                 # Ensure prefix is valid (no special characters except underscores)
-                prefix = re.sub(r'[^\w]', '', prefix)
+                prefix = _strip_non_word(prefix)
                 
                 # Make sure it's not empty
                 if not prefix:
@@ -160,341 +722,61 @@ class AISnippetGenerator:
             # Cache the generation
             self.recent_generations[cache_key] = {
                 'prefix': prefix,
-                'body': snippet_body,
-                'timestamp': time.time()
+                'body': snippet_body
             }
             
-            # Limit cache size (keep only the 50 most recent generations)
-            if len(self.recent_generations) > 50:
-                oldest_key = min(self.recent_generations.keys(), 
-                                key=lambda k: self.recent_generations[k]['timestamp'])
-                del self.recent_generations[oldest_key]
+            # Limit cache size (keep only the most recent generations)
+            if len(self.recent_generations) > self.MAX_RECENT_GENERATIONS:
+                self.recent_generations.popitem(last=False)
             
             return snippet
         except Exception as e:
             logger.error(f"Error generating snippet: {e}")
             return None
     
-    def _generate_snippet_body(self, language: str, description: str) -> List[str]:
+    def _generate_snippet_body(self,
+                               language: str,
+                               description: str,
+                               description_lower: Optional[str] = None) -> Sequence[str]:
         """Generate code for a snippet body based on language and description
         
         Args:
             language: Programming language
             description: Description of what the snippet should do
+            description_lower: Lowercase description, if the caller already has it
             
         Returns:
-            List of code lines for the snippet
+            Sequence of code lines for the snippet
         """
         # This implementation uses a rule-based language pattern matching system
         # with static templates. It can be replaced with an actual AI model API
         # call in production
         
-        description_lower = description.lower()
+        rules = _SNIPPET_RULES.get(language)
+        if rules is None:
+            # Default snippet for unknown languages
+            template = _GENERIC_DEFAULT_TEMPLATE
+        else:
+            # Find every keyword in the description with a single scan
+            if description_lower is None:
+                description_lower = description.lower()
+            if _SNIPPET_KEYWORD_AUTOMATON is not None:
+                found = _SNIPPET_LANGUAGE_KEYWORDS[language].intersection(
+                    keyword for _, keyword in _SNIPPET_KEYWORD_AUTOMATON.iter(description_lower))
+            else:
+                found = frozenset(_SNIPPET_KEYWORD_PATTERNS[language].findall(description_lower))
+            template = _select_template(language, found)
         
-        # Python snippets
-        if language == 'python':
-            if 'function' in description_lower or 'def' in description_lower:
-                return [
-                    "def ${1:function_name}(${2:parameters}):",
-                    "    \"\"\"${3:" + description + "}\"\"\"",
-                    "    ${4:# Function implementation}",
-                    "    ${5:pass}"
-                ]
-            elif 'class' in description_lower:
-                return [
-                    "class ${1:ClassName}:",
-                    "    \"\"\"${2:" + description + "}\"\"\"",
-                    "    def __init__(self, ${3:parameters}):",
-                    "        ${4:# Initialize attributes}",
-                    "        ${5:pass}",
-                    "    ",
-                    "    def ${6:method_name}(self, ${7:parameters}):",
-                    "        ${8:# Method implementation}",
-                    "        ${9:pass}"
-                ]
-            elif 'loop' in description_lower or 'for' in description_lower:
-                if 'range' in description_lower:
-                    return [
-                        "for ${1:i} in range(${2:n}):",
-                        "    ${3:# Loop body}",
-                        "    ${4:pass}"
-                    ]
-                else:
-                    return [
-                        "for ${1:item} in ${2:iterable}:",
-                        "    ${3:# Loop body}",
-                        "    ${4:pass}"
-                    ]
-            elif 'if' in description_lower or 'condition' in description_lower:
-                return [
-                    "if ${1:condition}:",
-                    "    ${2:# If block}",
-                    "    ${3:pass}",
-                    "elif ${4:other_condition}:",
-                    "    ${5:# Elif block}",
-                    "    ${6:pass}",
-                    "else:",
-                    "    ${7:# Else block}",
-                    "    ${8:pass}"
-                ]
-            elif 'try' in description_lower or 'except' in description_lower or 'error' in description_lower:
-                return [
-                    "try:",
-                    "    ${1:# Code that might raise an exception}",
-                    "    ${2:pass}",
-                    "except ${3:Exception} as ${4:e}:",
-                    "    ${5:# Handle the exception}",
-                    "    ${6:pass}",
-                    "finally:",
-                    "    ${7:# Cleanup code (always executed)}",
-                    "    ${8:pass}"
-                ]
-            elif 'import' in description_lower:
-                return [
-                    "import ${1:module}",
-                    "from ${2:package} import ${3:submodule}",
-                    "",
-                    "${4:# Use the imported modules}",
-                    "${5:pass}"
-                ]
-            elif 'file' in description_lower or 'open' in description_lower or 'read' in description_lower:
-                return [
-                    "with open(${1:file_path}, ${2:'r'}) as ${3:f}:",
-                    "    ${4:content} = ${3:f}.read()",
-                    "    ${5:# Process the file content}",
-                    "    ${6:pass}"
-                ]
-            # Default Python snippet
-            return [
-                "# ${1:" + description + "}",
-                "${2:# Your code here}",
-                "${3:pass}"
-            ]
-            
-        # JavaScript snippets
-        elif language == 'javascript' or language == 'js':
-            if 'function' in description_lower:
-                if 'arrow' in description_lower:
-                    return [
-                        "const ${1:functionName} = (${2:parameters}) => {",
-                        "  ${3:// Function implementation}",
-                        "  ${4:return ${5:result};}",
-                        "};"
-                    ]
-                else:
-                    return [
-                        "function ${1:functionName}(${2:parameters}) {",
-                        "  ${3:// Function implementation}",
-                        "  ${4:return ${5:result};}",
-                        "}"
-                    ]
-            elif 'class' in description_lower:
-                return [
-                    "class ${1:ClassName} {",
-                    "  constructor(${2:parameters}) {",
-                    "    ${3:// Initialize properties}",
-                    "    ${4:this.property = value;}",
-                    "  }",
-                    "  ",
-                    "  ${5:methodName}(${6:parameters}) {",
-                    "    ${7:// Method implementation}",
-                    "    ${8:return ${9:result};}",
-                    "  }",
-                    "}"
-                ]
-            elif 'loop' in description_lower or 'for' in description_lower:
-                if 'each' in description_lower:
-                    return [
-                        "${1:array}.forEach((${2:item}, ${3:index}) => {",
-                        "  ${4:// Loop body}",
-                        "});"
-                    ]
-                else:
-                    return [
-                        "for (let ${1:i} = 0; ${1:i} < ${2:array}.length; ${1:i}++) {",
-                        "  ${3:const} ${4:item} = ${2:array}[${1:i}];",
-                        "  ${5:// Loop body}",
-                        "}"
-                    ]
-            elif 'if' in description_lower or 'condition' in description_lower:
-                return [
-                    "if (${1:condition}) {",
-                    "  ${2:// If block}",
-                    "} else if (${3:otherCondition}) {",
-                    "  ${4:// Else if block}",
-                    "} else {",
-                    "  ${5:// Else block}",
-                    "}"
-                ]
-            elif 'try' in description_lower or 'catch' in description_lower or 'error' in description_lower:
-                return [
-                    "try {",
-                    "  ${1:// Code that might throw an error}",
-                    "} catch (${2:error}) {",
-                    "  ${3:// Handle the error}",
-                    "} finally {",
-                    "  ${4:// Cleanup code (always executed)}",
-                    "}"
-                ]
-            elif 'import' in description_lower:
-                return [
-                    "import ${1:{ moduleName }} from '${2:module}';",
-                    "",
-                    "${3:// Use the imported module}",
-                    "${4:// Your code here}"
-                ]
-            elif 'file' in description_lower or 'read' in description_lower:
-                return [
-                    "const fs = require('fs');",
-                    "",
-                    "fs.readFile('${1:file_path}', '${2:utf8}', (${3:err}, ${4:data}) => {",
-                    "  if (${3:err}) {",
-                    "    console.error(${3:err});",
-                    "    return;",
-                    "  }",
-                    "  ${5:// Process the file content}",
-                    "});"
-                ]
-            # Default JavaScript snippet
-            return [
-                "// ${1:" + description + "}",
-                "${2:// Your code here}"
-            ]
-            
-        # HTML snippets
-        elif language == 'html':
-            if 'form' in description_lower:
-                return [
-                    "<form action=\"${1:#}\" method=\"${2:post}\">",
-                    "  <div class=\"${3:form-group}\">",
-                    "    <label for=\"${4:input-id}\">${5:Label}</label>",
-                    "    <input type=\"${6:text}\" id=\"${4:input-id}\" name=\"${7:input-name}\" class=\"${8:form-control}\">",
-                    "  </div>",
-                    "  <button type=\"submit\" class=\"${9:btn}\">${10:Submit}</button>",
-                    "</form>"
-                ]
-            elif 'table' in description_lower:
-                return [
-                    "<table class=\"${1:table}\">",
-                    "  <thead>",
-                    "    <tr>",
-                    "      <th>${2:Column 1}</th>",
-                    "      <th>${3:Column 2}</th>",
-                    "      <th>${4:Column 3}</th>",
-                    "    </tr>",
-                    "  </thead>",
-                    "  <tbody>",
-                    "    <tr>",
-                    "      <td>${5:Data 1}</td>",
-                    "      <td>${6:Data 2}</td>",
-                    "      <td>${7:Data 3}</td>",
-                    "    </tr>",
-                    "  </tbody>",
-                    "</table>"
-                ]
-            elif 'list' in description_lower:
-                if 'unordered' in description_lower:
-                    return [
-                        "<ul class=\"${1:list}\">",
-                        "  <li>${2:Item 1}</li>",
-                        "  <li>${3:Item 2}</li>",
-                        "  <li>${4:Item 3}</li>",
-                        "</ul>"
-                    ]
-                else:
-                    return [
-                        "<ol class=\"${1:list}\">",
-                        "  <li>${2:Item 1}</li>",
-                        "  <li>${3:Item 2}</li>",
-                        "  <li>${4:Item 3}</li>",
-                        "</ol>"
-                    ]
-            elif 'div' in description_lower or 'container' in description_lower:
-                return [
-                    "<div class=\"${1:container}\">",
-                    "  <div class=\"${2:row}\">",
-                    "    <div class=\"${3:col}\">",
-                    "      ${4:<!-- Content here -->}",
-                    "    </div>",
-                    "  </div>",
-                    "</div>"
-                ]
-            elif 'nav' in description_lower or 'menu' in description_lower:
-                return [
-                    "<nav class=\"${1:navbar}\">",
-                    "  <ul class=\"${2:nav-list}\">",
-                    "    <li class=\"${3:nav-item}\"><a href=\"${4:#}\">${5:Home}</a></li>",
-                    "    <li class=\"${3:nav-item}\"><a href=\"${6:#}\">${7:About}</a></li>",
-                    "    <li class=\"${3:nav-item}\"><a href=\"${8:#}\">${9:Contact}</a></li>",
-                    "  </ul>",
-                    "</nav>"
-                ]
-            # Default HTML snippet
-            return [
-                "<!-- ${1:" + description + "} -->",
-                "<div class=\"${2:container}\">",
-                "  ${3:<!-- Your content here -->}",
-                "</div>"
-            ]
-            
-        # CSS snippets
-        elif language == 'css':
-            if 'flex' in description_lower:
-                return [
-                    ".${1:container} {",
-                    "  display: flex;",
-                    "  flex-direction: ${2:row};",
-                    "  justify-content: ${3:space-between};",
-                    "  align-items: ${4:center};",
-                    "  ${5:/* Additional flex properties */}",
-                    "}"
-                ]
-            elif 'grid' in description_lower:
-                return [
-                    ".${1:container} {",
-                    "  display: grid;",
-                    "  grid-template-columns: ${2:repeat(3, 1fr)};",
-                    "  grid-gap: ${3:10px};",
-                    "  ${4:/* Additional grid properties */}",
-                    "}"
-                ]
-            elif 'animation' in description_lower:
-                return [
-                    "@keyframes ${1:animation-name} {",
-                    "  0% {",
-                    "    ${2:opacity: 0;}",
-                    "  }",
-                    "  100% {",
-                    "    ${3:opacity: 1;}",
-                    "  }",
-                    "}",
-                    "",
-                    ".${4:element} {",
-                    "  animation: ${1:animation-name} ${5:1s} ${6:ease-in-out};",
-                    "}"
-                ]
-            elif 'media' in description_lower or 'responsive' in description_lower:
-                return [
-                    "@media (${1:max-width: 768px}) {",
-                    "  .${2:element} {",
-                    "    ${3:/* Responsive styles */}",
-                    "    ${4:width: 100%;}",
-                    "  }",
-                    "}"
-                ]
-            # Default CSS snippet
-            return [
-                ".${1:selector} {",
-                "  ${2:property}: ${3:value};",
-                "  ${4:/* Additional styles */}",
-                "}"
-            ]
+        # Templates without a description line are shared as-is; otherwise
+        # only the description line has to be built
+        lines, description_index, affixes = template
+        if description_index is None:
+            return lines
         
-        # Default snippet for unknown languages
-        return [
-            "// ${1:" + description + "}",
-            "${2:// Insert your code here}"
-        ]
+        before, after = affixes
+        body = list(lines)
+        body[description_index] = f"{before}{description}{after}"
+        return body
     
     def add_snippet(self, snippet: Snippet) -> bool:
         """Add a snippet to the AI-generated collection
@@ -506,25 +788,23 @@ class AISnippetGenerator:
             True if added successfully, False otherwise
         """
         try:
-            with self.snippet_lock:
-                # Initialize language entry if needed
-                if snippet.language not in self.ai_snippets:
-                    self.ai_snippets[snippet.language] = []
-                
-                # Check if a snippet with the same name already exists
-                for i, existing in enumerate(self.ai_snippets[snippet.language]):
-                    if existing.name == snippet.name:
-                        # Replace the existing snippet
-                        self.ai_snippets[snippet.language][i] = snippet
-                        # Save the updated snippets
-                        self._save_ai_snippets(snippet.language)
-                        return True
+            with self._language_lock(snippet.language):
+                # Add the snippet, replacing any existing one with the same name
+                snippets = self.ai_snippets.setdefault(snippet.language, {})
+                existing = snippets.get(snippet.name)
+                if existing is not None and existing._key() == snippet._key():
+                    # Nothing changed, so there's nothing to index or save
+                    return True
+                snippets[snippet.name] = snippet
                 
-                # Add new snippet
-                self.ai_snippets[snippet.language].append(snippet)
+                # Keep the prefix index in sync
+                index = self._prefix_index.setdefault(snippet.language, [])
+                if existing is not None:
+                    self._remove_from_prefix_index(index, existing)
+                bisect.insort(index, (snippet.prefix, snippet.name, snippet))
                 
-                # Save the updated snippets
-                self._save_ai_snippets(snippet.language)
+                # Schedule the updated snippets to be saved
+                self._mark_dirty(snippet.language)
                 
                 return True
         except Exception as e:
@@ -542,20 +822,16 @@ class AISnippetGenerator:
             True if removed successfully, False otherwise
         """
         try:
-            with self.snippet_lock:
-                # Check if language exists
-                if language not in self.ai_snippets:
-                    return False
-                
+            with self._language_lock(language):
                 # Find and remove the snippet
-                for i, snippet in enumerate(self.ai_snippets[language]):
-                    if snippet.name == name:
-                        self.ai_snippets[language].pop(i)
-                        # Save the updated snippets
-                        self._save_ai_snippets(language)
-                        return True
+                snippet = self.ai_snippets.get(language, {}).pop(name, None)
+                if snippet is None:
+                    return False
+                self._remove_from_prefix_index(self._prefix_index[language], snippet)
                 
-                return False
+                # Schedule the updated snippets to be saved
+                self._mark_dirty(language)
+                return True
         except Exception as e:
             logger.error(f"Error removing AI snippet: {e}")
             return False
@@ -569,7 +845,7 @@ class AISnippetGenerator:
         Returns:
             List of Snippet objects
         """
-        return self.ai_snippets.get(language, [])
+        return list(self.ai_snippets.get(language, {}).values())
     
     def get_matching_snippets(self, language: str, prefix: str) -> List[Snippet]:
         """Get AI-generated snippets that match a given prefix
@@ -581,15 +857,38 @@ class AISnippetGenerator:
         Returns:
             List of matching Snippet objects
         """
-        snippets = self.get_snippets_for_language(language)
         matches = []
         
-        for snippet in snippets:
-            if snippet.prefix.startswith(prefix):
-                matches.append(snippet)
+        with self._language_lock(language):
+            index = self._prefix_index.get(language)
+            if not index:
+                return matches
+            
+            # An empty prefix matches everything
+            if not prefix:
+                return [entry[2] for entry in index]
+            
+            # Matching prefixes form a contiguous run in the sorted index
+            position = bisect.bisect_left(index, (prefix,))
+            end = len(index)
+            while position < end and index[position][0].startswith(prefix):
+                matches.append(index[position][2])
+                position += 1
         
         return matches
     
+    @staticmethod
+    def _remove_from_prefix_index(index: List[Tuple[str, str, Snippet]], snippet: Snippet) -> None:
+        """Remove a snippet's entry from a language's prefix index
+        
+        Args:
+            index: Sorted prefix index of the snippet's language
+            snippet: Snippet to remove
+        """
+        position = bisect.bisect_left(index, (snippet.prefix, snippet.name))
+        if position < len(index) and index[position][2] is snippet:
+            del index[position]
+    
     def create_snippet_from_code(self, 
                                language: str, 
                                code: str, 
@@ -613,10 +912,12 @@ class AISnippetGenerator:
             code_lines = code.splitlines()
             
             # Remove leading/trailing empty lines
-            while code_lines and not code_lines[0].strip():
-                code_lines.pop(0)
-            while code_lines and not code_lines[-1].strip():
-                code_lines.pop()
+            start, end = 0, len(code_lines)
+            while start < end and not code_lines[start].strip():
+                start += 1
+            while end > start and not code_lines[end - 1].strip():
+                end -= 1
+            code_lines = code_lines[start:end]
             
             if not code_lines:
                 logger.warning("Cannot create snippet from empty code")
@@ -628,8 +929,8 @@ class AISnippetGenerator:
                 first_line = code_lines[0].strip()
                 
                 # Common patterns
-                function_match = re.match(r'(?:function|def|async def)\s+(\w+)', first_line)
-                class_match = re.match(r'class\s+(\w+)', first_line)
+                function_match = _RE_FUNCTION_NAME.match(first_line)
+                class_match = _RE_CLASS_NAME.match(first_line)
                 
                 if function_match:
                     name = function_match.group(1) + " function"
@@ -645,7 +946,7 @@ class AISnippetGenerator:
                     # Use the first word of the name, lowercase
                     prefix = name.split()[0].lower()
                     # Ensure it's a valid identifier
-                    prefix = re.sub(r'[^\w]', '', prefix)
+                    prefix = _strip_non_word(prefix)
                     
                     # Make sure it's not empty
                     if not prefix:
@@ -658,7 +959,7 @@ class AISnippetGenerator:
                 # Try to extract a description from comments
                 for line in code_lines:
                     # Look for comment lines
-                    comment_match = re.search(r'(?://|#|/\*|\*|"""|\'\'\')(.+)', line.strip())
+                    comment_match = _RE_COMMENT.search(line.strip())
                     if comment_match:
                         description = comment_match.group(1).strip()
                         break
@@ -678,6 +979,8 @@ class AISnippetGenerator:
 
 # Singleton instance
 _ai_snippet_generator = None
+# Lock guarding creation of the singleton instance
+_ai_snippet_generator_lock = threading.Lock()
 
 def get_ai_snippet_generator() -> AISnippetGenerator:
     """Get the global AISnippetGenerator instance
@@ -687,5 +990,16 @@ def get_ai_snippet_generator() -> AISnippetGenerator:
     """
     global _ai_snippet_generator
     if _ai_snippet_generator is None:
-        _ai_snippet_generator = AISnippetGenerator()
-    return _ai_snippet_generator
\ No newline at end of file
+        with _ai_snippet_generator_lock:
+            # Re-check in case another thread created it while we waited
+            if _ai_snippet_generator is None:
+                _ai_snippet_generator = AISnippetGenerator()
+    return _ai_snippet_generator
+
+def _flush_ai_snippet_generator() -> None:
+    """Write pending changes of the global instance, if one was created"""
+    if _ai_snippet_generator is not None:
+        _ai_snippet_generator.flush()
+
+# Make sure pending changes are written when the editor exits
+atexit.register(_flush_ai_snippet_generator)
\ No newline at end of file
@@ -2,59 +2,170 @@
 Animations - Provides animation framework for UI elements
 """
 
+import functools
+import heapq
+import itertools
+import logging
 import threading
 import time
 import math
 
+logger = logging.getLogger(__name__)
+
+_exp2 = math.exp2
+_sin = math.sin
+_PI_OVER_6 = math.pi / 6
+
+# Easing functions, mapping linear progress (0.0 to 1.0) to eased progress
+def _linear(p):
+    return p
+
+def _ease_in_quad(p):
+    return p * p
+
+def _ease_out_quad(p):
+    return -(p * (p - 2))
+
+def _ease_in_out_quad(p):
+    p *= 2
+    if p < 1:
+        return 0.5 * p * p
+    p -= 1
+    return -0.5 * (p * (p - 2) - 1)
+
+def _ease_out_bounce(p):
+    if p < (1/2.75):
+        return 7.5625 * p * p
+    elif p < (2/2.75):
+        p -= (1.5/2.75)
+        return 7.5625 * p * p + 0.75
+    elif p < (2.5/2.75):
+        p -= (2.25/2.75)
+        return 7.5625 * p * p + 0.9375
+    else:
+        p -= (2.625/2.75)
+        return 7.5625 * p * p + 0.984375
+
+def _ease_in_elastic(p):
+    if p == 0 or p == 1:
+        return p
+    p -= 1
+    return -(_exp2(10 * p) * _sin((p * 40 - 3) * _PI_OVER_6))
+
+def _ease_out_elastic(p):
+    if p == 0 or p == 1:
+        return p
+    return _exp2(-10 * p) * _sin((p * 40 - 3) * _PI_OVER_6) + 1
+
+EASING_FUNCTIONS = {
+    "linear": _linear,
+    "ease_in_quad": _ease_in_quad,
+    "ease_out_quad": _ease_out_quad,
+    "ease_in_out_quad": _ease_in_out_quad,
+    "ease_out_bounce": _ease_out_bounce,
+    "ease_in_elastic": _ease_in_elastic,
+    "ease_out_elastic": _ease_out_elastic,
+}
+
+@functools.lru_cache(maxsize=64)
+def easing_table(easing_function, steps):
+    """Get an easing curve sampled at every step of an animation
+    
+    Animations only ever evaluate their curve at step / steps, so expensive
+    curves (elastic, bounce) can be computed once per step count and shared.
+    
+    Returns:
+        Tuple of steps + 1 eased progress values
+    """
+    ease = EASING_FUNCTIONS.get(easing_function, _linear)
+    return tuple(ease(step / steps) for step in range(steps)) + (ease(1.0),)
+
+@functools.lru_cache(maxsize=256)
+def interpolation_table(start, end, easing_function, steps):
+    """Get the value of an eased interpolation at every step of an animation
+    
+    Animations of many elements between the same values (a list of items
+    sliding in, panels fading together) share one precomputed table, so their
+    frames are just lookups.
+    
+    Returns:
+        Tuple of steps + 1 interpolated values
+    """
+    delta = end - start
+    return tuple(start + delta * progress for progress in easing_table(easing_function, steps))
+
+
+def property_setter(target_object, property_name):
+    """Get a function that sets a property of an animation's target
+    
+    The target is checked once when the animation is created instead of on
+    every frame.
+    
+    Returns:
+        The setter, or None if the target doesn't have the property
+    """
+    if hasattr(target_object, property_name):
+        return functools.partial(setattr, target_object, property_name)
+    return None
+
+
 class AnimationState:
     """Base class for animation state tracking"""
     def __init__(self):
         self.animating = False
         self.start_time = 0
         self.current_step = 0
-        self.max_steps = 10  # Default number of animation frames
+        self.max_steps = None  # Number of animation frames, None to fit the frame rate
         self.duration = 0.3  # Default animation duration in seconds
-        self.timer = None
+        self._derived_steps = None  # max_steps last derived from the frame rate
+        self._frame_generation = 0  # Invalidates frames queued before a restart/stop
         
     def start(self):
         """Start the animation"""
         self.animating = True
         self.current_step = 0
-        self.start_time = time.time()
-        self.schedule_next_frame()
+        
+        # Unless a subclass fixed the number of frames, spread the duration
+        # over frames at the manager's target frame rate
+        if self.max_steps is None or self.max_steps == self._derived_steps:
+            self.max_steps = max(1, math.ceil(self.duration * animation_manager.target_fps))
+            self._derived_steps = self.max_steps
+        self.on_start()
+        
+        self.start_time = time.monotonic()
+        self._frame_generation += 1
+        animation_manager.schedule_frame(self, self.start_time + self.duration / self.max_steps,
+                                         self._frame_generation)
         
     def stop(self):
         """Stop the animation immediately"""
         self.animating = False
-        if self.timer:
-            self.timer.cancel()
-            self.timer = None
-            
-    def schedule_next_frame(self):
-        """Schedule the next animation frame"""
-        if not self.animating:
-            return
+        # Frames already queued with the scheduler are dropped when they come due
+        self._frame_generation += 1
             
-        step_duration = self.duration / self.max_steps
-        self.timer = threading.Timer(step_duration, self._advance)
-        self.timer.daemon = True  # Don't prevent application exit
-        self.timer.start()
+    def _tick(self):
+        """Advance the animation to the next frame
         
-    def _advance(self):
-        """Advance the animation to the next frame"""
+        Returns:
+            Delay in seconds until the following frame, or None if the
+            animation is done
+        """
         if not self.animating:
-            return
+            return None
             
         self.current_step += 1
         
         # Check if animation is complete
         if self.current_step >= self.max_steps:
             self.on_complete()
-            return
+            return None
             
-        # Schedule next frame
         self.on_frame()
-        self.schedule_next_frame()
+        return self.duration / self.max_steps
+        
+    def on_start(self):
+        """Called when the animation starts, before its first frame - override in subclasses"""
+        pass
         
     def on_frame(self):
         """Called on each animation frame - override in subclasses"""
@@ -72,45 +183,8 @@ class AnimationState:
         
     def get_eased_progress(self, easing_function="ease_out_quad"):
         """Get the current animation progress with easing applied"""
-        linear_progress = self.get_progress()
-        
-        # Apply easing function
-        if easing_function == "linear":
-            return linear_progress
-        elif easing_function == "ease_in_quad":
-            return linear_progress * linear_progress
-        elif easing_function == "ease_out_quad":
-            return -(linear_progress * (linear_progress - 2))
-        elif easing_function == "ease_in_out_quad":
-            p = linear_progress * 2
-            if p < 1:
-                return 0.5 * p * p
-            p -= 1
-            return -0.5 * (p * (p - 2) - 1)
-        elif easing_function == "ease_out_bounce":
-            if linear_progress < (1/2.75):
-                return 7.5625 * linear_progress * linear_progress
-            elif linear_progress < (2/2.75):
-                p = linear_progress - (1.5/2.75)
-                return 7.5625 * p * p + 0.75
-            elif linear_progress < (2.5/2.75):
-                p = linear_progress - (2.25/2.75)
-                return 7.5625 * p * p + 0.9375
-            else:
-                p = linear_progress - (2.625/2.75)
-                return 7.5625 * p * p + 0.984375
-        elif easing_function == "ease_in_elastic":
-            if linear_progress == 0 or linear_progress == 1:
-                return linear_progress
-            p = linear_progress - 1
-            return -(math.pow(2, 10 * p) * math.sin((p * 40 - 3) * math.pi / 6))
-        elif easing_function == "ease_out_elastic":
-            if linear_progress == 0 or linear_progress == 1:
-                return linear_progress
-            return math.pow(2, -10 * linear_progress) * math.sin((linear_progress * 40 - 3) * math.pi / 6) + 1
-            
-        # Default to linear
-        return linear_progress
+        # Unknown easing functions default to linear
+        return EASING_FUNCTIONS.get(easing_function, _linear)(self.get_progress())
 
 
 class FadeAnimation(AnimationState):
@@ -119,22 +193,29 @@ class FadeAnimation(AnimationState):
         super().__init__()
         self.target_object = target_object
         self.property_name = property_name
+        self._set_property = property_setter(target_object, property_name)
         self.start_value = float(start_value)  # Convert to float to ensure compatibility
         self.end_value = float(end_value)      # Convert to float to ensure compatibility
         self.on_update = on_update
+        self._values = ()
+        
+    def on_start(self):
+        """Look up the interpolated values for this run"""
+        self._values = interpolation_table(self.start_value, self.end_value, "ease_out_quad", self.max_steps)
         
     def on_frame(self):
         """Update the target property on each frame"""
-        progress = self.get_eased_progress("ease_out_quad")
-        current_value = self.start_value + (self.end_value - self.start_value) * progress
+        current_value = self._values[self.current_step]
         
         # Update the target property
-        if hasattr(self.target_object, self.property_name):
-            setattr(self.target_object, self.property_name, current_value)
+        set_property = self._set_property
+        if set_property is not None:
+            set_property(current_value)
             
         # Call the update callback if provided
-        if self.on_update:
-            self.on_update(current_value)
+        on_update = self.on_update
+        if on_update:
+            on_update(current_value)
 
 
 class SlideAnimation(AnimationState):
@@ -143,22 +224,29 @@ class SlideAnimation(AnimationState):
         super().__init__()
         self.target_object = target_object
         self.property_name = property_name
+        self._set_property = property_setter(target_object, property_name)
         self.start_pos = start_pos
         self.end_pos = end_pos
         self.on_update = on_update
+        self._values = ()
+        
+    def on_start(self):
+        """Look up the interpolated positions for this run"""
+        self._values = interpolation_table(self.start_pos, self.end_pos, "ease_out_quad", self.max_steps)
         
     def on_frame(self):
         """Update the target property on each frame"""
-        progress = self.get_eased_progress("ease_out_quad")
-        current_pos = self.start_pos + (self.end_pos - self.start_pos) * progress
+        current_pos = self._values[self.current_step]
         
         # Update the target property
-        if hasattr(self.target_object, self.property_name):
-            setattr(self.target_object, self.property_name, current_pos)
+        set_property = self._set_property
+        if set_property is not None:
+            set_property(current_pos)
             
         # Call the update callback if provided
-        if self.on_update:
-            self.on_update(current_pos)
+        on_update = self.on_update
+        if on_update:
+            on_update(current_pos)
 
 
 class ScaleAnimation(AnimationState):
@@ -167,22 +255,29 @@ class ScaleAnimation(AnimationState):
         super().__init__()
         self.target_object = target_object
         self.property_name = property_name
+        self._set_property = property_setter(target_object, property_name)
         self.start_scale = start_scale
         self.end_scale = end_scale
         self.on_update = on_update
+        self._values = ()
+        
+    def on_start(self):
+        """Look up the interpolated scales for this run"""
+        self._values = interpolation_table(self.start_scale, self.end_scale, "ease_out_elastic", self.max_steps)
         
     def on_frame(self):
         """Update the target property on each frame"""
-        progress = self.get_eased_progress("ease_out_elastic")
-        current_scale = self.start_scale + (self.end_scale - self.start_scale) * progress
+        current_scale = self._values[self.current_step]
         
         # Update the target property
-        if hasattr(self.target_object, self.property_name):
-            setattr(self.target_object, self.property_name, current_scale)
+        set_property = self._set_property
+        if set_property is not None:
+            set_property(current_scale)
             
         # Call the update callback if provided
-        if self.on_update:
-            self.on_update(current_scale)
+        on_update = self.on_update
+        if on_update:
+            on_update(current_scale)
 
 
 class BlinkAnimation(AnimationState):
@@ -191,28 +286,98 @@ class BlinkAnimation(AnimationState):
         super().__init__()
         self.target_object = target_object
         self.property_name = property_name
+        self._set_property = property_setter(target_object, property_name)
         self.blink_count = blink_count
         self.on_update = on_update
         self.max_steps = blink_count * 2  # Two steps per blink (on/off)
+        self._values = ()
+        
+    def on_start(self):
+        """Build the on/off sequence for this run"""
+        # Alternate between 1 and 0 for each step
+        self._values = tuple(1 - (step & 1) for step in range(self.max_steps))
         
     def on_frame(self):
         """Update the target property on each frame"""
-        # Alternate between 0 and 1 for each step
-        value = 1 if (self.current_step % 2) == 0 else 0
+        value = self._values[self.current_step]
         
         # Update the target property
-        if hasattr(self.target_object, self.property_name):
-            setattr(self.target_object, self.property_name, value)
+        set_property = self._set_property
+        if set_property is not None:
+            set_property(value)
             
         # Call the update callback if provided
-        if self.on_update:
-            self.on_update(value)
+        on_update = self.on_update
+        if on_update:
+            on_update(value)
 
 
 class AnimationManager:
     """Manages multiple animations"""
-    def __init__(self):
+    def __init__(self, target_fps=60):
         self.animations = {}
+        self.target_fps = target_fps
+        
+        # Frame scheduler shared by all animations: a heap of
+        # (deadline, sequence, generation, animation) entries serviced by
+        # one thread instead of a Timer thread per frame
+        self._frame_heap = []
+        self._frame_sequence = itertools.count()
+        self._frame_condition = threading.Condition()
+        self._scheduler_thread = None
+        
+    def schedule_frame(self, animation, deadline, generation):
+        """Queue an animation frame to run at a time.monotonic() deadline"""
+        with self._frame_condition:
+            entry = (deadline, next(self._frame_sequence), generation, animation)
+            heapq.heappush(self._frame_heap, entry)
+            
+            if self._scheduler_thread is None:
+                self._scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
+                self._scheduler_thread.start()
+            elif self._frame_heap[0] is entry:
+                # The new frame is due before the one the scheduler waits for
+                self._frame_condition.notify()
+                
+    def _run_scheduler(self):
+        """Run animation frames as they come due"""
+        heap = self._frame_heap
+        while True:
+            with self._frame_condition:
+                while True:
+                    now = time.monotonic()
+                    if heap and heap[0][0] <= now:
+                        break
+                    self._frame_condition.wait(heap[0][0] - now if heap else None)
+                    
+                due = []
+                while heap and heap[0][0] <= now:
+                    due.append(heapq.heappop(heap))
+                    
+            # Advance outside the lock so frame callbacks can start and stop animations
+            for deadline, _, generation, animation in due:
+                if generation != animation._frame_generation:
+                    continue
+                    
+                try:
+                    delay = animation._tick()
+                except Exception:
+                    # A failing animation must not take the others down with it
+                    animation.animating = False
+                    logger.exception("Error in animation frame, stopping %r", animation)
+                    continue
+                    
+                # Queue the following frame from this frame's deadline rather
+                # than from now so frame timing doesn't drift
+                if delay is not None and animation.animating:
+                    self.schedule_frame(animation, deadline + delay, generation)
+        
+    def set_target_fps(self, fps):
+        """Set the frame rate animations are spread over, e.g. to match the terminal
+        
+        Takes effect the next time each animation starts.
+        """
+        self.target_fps = max(1, fps)
         
     def add_animation(self, name, animation):
         """Add an animation to the manager"""
@@ -3,43 +3,68 @@
 Auto-Indentation - Handles smart code indentation for various languages
 """
 
+import math
 import re
 
+# Precompiled patterns, these run on every Enter press
+_RE_LEADING_WHITESPACE = re.compile(r'^\s+', re.MULTILINE)
+_RE_LINE_INDENT = re.compile(r'^\s*')
+_RE_PYTHON_BLOCK_START = re.compile(r':\s*(#.*)?$')
+_RE_C_CONTROL = re.compile(r'(if|for|while|else)\s*\(.*\)\s*(//.*)?$')
+_RE_C_ELSE = re.compile(r'\s*else\s*(//.*)?$')
+_RE_HTML_TAG = re.compile(r'<(/?)[a-zA-Z][a-zA-Z0-9]*[^>]*?(/?)>')
+_RE_HTML_LEADING_CLOSING_TAG = re.compile(r'\s*</[a-zA-Z][a-zA-Z0-9]*>')
+
+# A document keeps its indentation style, so apply_auto_indent only detects
+# it again once the buffer has grown or shrunk by this many characters
+INDENT_REDETECT_THRESHOLD = 1000
+
+# Last (text, indent) computed by get_indent_size; holding on to the text
+# means an identity check is enough to reuse the result
+_last_indent_size = (None, None)
+
 def get_indent_size(text, use_tabs=False):
     """
     Get the indentation size from text.
     Returns tab character if use_tabs is True, otherwise returns spaces.
     """
+    global _last_indent_size
+    
     if use_tabs:
         return '\t'
     
-    # Find all leading whitespace in the document
-    leading_spaces = re.findall(r'^\s+', text, re.MULTILINE)
+    # Repeated calls for the same document don't have to rescan it
+    last_text, last_indent = _last_indent_size
+    if text is last_text:
+        return last_indent
+    
+    indent = _detect_indent(text)
+    _last_indent_size = (text, indent)
+    return indent
+
+def _detect_indent(text):
+    """
+    Detect the indentation string used by a document.
+    """
+    # Find all distinct leading whitespace in the document; large files
+    # repeat the same few indents thousands of times, and duplicates can't
+    # change the GCD
+    leading_spaces = set(_RE_LEADING_WHITESPACE.findall(text))
     
     if not leading_spaces:
         return '    '  # Default to 4 spaces if no indentation detected
     
     # Count spaces in each leading whitespace
-    space_counts = [len(spaces.replace('\t', '    ')) for spaces in leading_spaces]
+    space_counts = {len(spaces.replace('\t', '    ')) for spaces in leading_spaces}
     
     # Filter out zero counts
-    non_zero_counts = [count for count in space_counts if count > 0]
+    space_counts.discard(0)
     
-    if not non_zero_counts:
+    if not space_counts:
         return '    '  # Default to 4 spaces
     
     # Find the most common indent by GCD
-    def gcd(a, b):
-        while b:
-            a, b = b, a % b
-        return a
-    
-    if len(non_zero_counts) == 1:
-        indent_size = non_zero_counts[0]
-    else:
-        indent_size = non_zero_counts[0]
-        for count in non_zero_counts[1:]:
-            indent_size = gcd(indent_size, count)
+    indent_size = math.gcd(*space_counts)
     
     # If the indent size is 0 or unreasonably large, default to 4
     if indent_size == 0 or indent_size > 8:
@@ -47,60 +72,112 @@ def get_indent_size(text, use_tabs=False):
     
     return ' ' * indent_size
 
+def _increase_indent_python(line):
+    # Lines ending with : (ignoring comments)
+    return bool(_RE_PYTHON_BLOCK_START.search(line))
+
+def _c_brace_balance(line):
+    """Count the braces a C-style line opens minus the ones it closes
+    
+    Braces inside string literals or a trailing // comment don't count.
+    """
+    if '"' not in line and "'" not in line and '`' not in line:
+        # No strings, so the first // starts the comment
+        code = line.partition('//')[0]
+        return code.count('{') - code.count('}')
+    
+    balance = 0
+    quote = None
+    escaped = False
+    previous = ''
+    for char in line:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in '"\'`':
+            quote = char
+        elif char == '/' and previous == '/':
+            break
+        elif char == '{':
+            balance += 1
+        elif char == '}':
+            balance -= 1
+        previous = '' if quote else char
+    return balance
+
+def _increase_indent_c(line):
+    # Check for C-style block starters: more braces opened than closed,
+    # ignoring braces in strings and in any trailing // comment
+    if _c_brace_balance(line) > 0:
+        return True
+    # Handle special cases like if/for/while statements without braces
+    return bool(_RE_C_CONTROL.search(line))
+
+def _increase_indent_markup(line):
+    # Count tags that are opened but not closed, classifying every tag in
+    # a single scan
+    open_count = 0
+    for closing, self_closing in _RE_HTML_TAG.findall(line):
+        if closing:
+            open_count -= 1
+        elif not self_closing:
+            open_count += 1
+    return open_count > 0
+
+# Statements that continue the block above them at a lower indentation
+_PYTHON_DEDENT_KEYWORDS = ('else:', 'elif ', 'except:', 'except ', 'finally:')
+
+def _decrease_indent_python(line):
+    # Check for Python dedent patterns
+    stripped = line.lstrip()
+    return stripped.startswith(_PYTHON_DEDENT_KEYWORDS) and ':' in stripped
+
+def _decrease_indent_c(line):
+    # Check for C-style block enders
+    stripped = line.lstrip()
+    if stripped.startswith('}') and '{' not in stripped:
+        return True
+    # Check for else without braces
+    return bool(_RE_C_ELSE.match(line))
+
+def _decrease_indent_markup(line):
+    # Check if line starts with a closing tag
+    return bool(_RE_HTML_LEADING_CLOSING_TAG.match(line))
+
+def _no_indent_change(line):
+    return False
+
+# Language to (should increase indent, should decrease indent) rules
+_INDENT_RULES = {
+    'python': (_increase_indent_python, _decrease_indent_python),
+    'javascript': (_increase_indent_c, _decrease_indent_c),
+    'typescript': (_increase_indent_c, _decrease_indent_c),
+    'java': (_increase_indent_c, _decrease_indent_c),
+    'c': (_increase_indent_c, _decrease_indent_c),
+    'cpp': (_increase_indent_c, _decrease_indent_c),
+    'csharp': (_increase_indent_c, _decrease_indent_c),
+    'html': (_increase_indent_markup, _decrease_indent_markup),
+    'xml': (_increase_indent_markup, _decrease_indent_markup),
+}
+_DEFAULT_INDENT_RULES = (_no_indent_change, _no_indent_change)
+
 def should_increase_indent(line, language="python"):
     """
     Determine if the next line should have increased indentation.
     """
-    if language == "python":
-        # Check for Python block starters
-        if re.search(r':\s*(#.*)?$', line):  # Lines ending with : (ignoring comments)
-            return True
-        
-    elif language in ["javascript", "typescript", "java", "c", "cpp", "csharp"]:
-        # Check for C-style block starters
-        if '{' in line and '}' not in line:
-            return True
-        # Handle special cases like if/for/while statements without braces
-        if re.search(r'(if|for|while|else)\s*\(.*\)\s*(//.*)?$', line):
-            return True
-    
-    elif language in ["html", "xml"]:
-        # Check for opening tags without closing tags
-        opening_tags = re.findall(r'<([a-zA-Z][a-zA-Z0-9]*)[^>]*>', line)
-        closing_tags = re.findall(r'</([a-zA-Z][a-zA-Z0-9]*)>', line)
-        self_closing = re.findall(r'<([a-zA-Z][a-zA-Z0-9]*)[^>]*/>', line)
-        
-        # Count tags that are opened but not closed
-        open_count = len(opening_tags) - len(closing_tags) - len(self_closing)
-        return open_count > 0
-        
-    return False
+    return _INDENT_RULES.get(language, _DEFAULT_INDENT_RULES)[0](line)
 
 def should_decrease_indent(line, language="python"):
     """
     Determine if the current line should have decreased indentation.
     """
-    if language == "python":
-        # Check for Python dedent patterns
-        if re.match(r'\s*(else|elif|except|finally):', line):
-            return True
-            
-    elif language in ["javascript", "typescript", "java", "c", "cpp", "csharp"]:
-        # Check for C-style block enders
-        if '}' in line and '{' not in line:
-            return True
-        # Check for else without braces
-        if re.match(r'\s*else\s*(//.*)?$', line):
-            return True
-            
-    elif language in ["html", "xml"]:
-        # Check if line starts with a closing tag
-        if re.match(r'\s*</[a-zA-Z][a-zA-Z0-9]*>', line):
-            return True
-    
-    return False
+    return _INDENT_RULES.get(language, _DEFAULT_INDENT_RULES)[1](line)
 
-def get_smart_indent(text, cursor_position, language="python"):
+def get_smart_indent(text, cursor_position, language="python", indent_str=None):
     """
     Determine the appropriate indentation for the next line.
     
@@ -108,21 +185,20 @@ def get_smart_indent(text, cursor_position, language="python"):
         text: The entire document text
         cursor_position: The current cursor position
         language: The programming language for language-specific rules
+        indent_str: The document's indentation string, if already known
     
     Returns:
         The indentation string to use for the next line
     """
     # Get the indentation size
-    indent_str = get_indent_size(text)
+    if indent_str is None:
+        indent_str = get_indent_size(text)
     
-    # Get the current line
-    lines = text[:cursor_position].split('\n')
-    if not lines:
-        return ''
-    
-    current_line = lines[-1]
+    # Get the current line (up to the cursor) without copying the text before it
+    line_start = text.rfind('\n', 0, cursor_position) + 1
+    current_line = text[line_start:cursor_position]
     # Match leading whitespace, safely handling empty lines
-    indent_match = re.match(r'^\s*', current_line)
+    indent_match = _RE_LINE_INDENT.match(current_line)
     current_indent = indent_match.group(0) if indent_match else ''
     
     # Check if we need to increase indentation
@@ -135,6 +211,38 @@ def get_smart_indent(text, cursor_position, language="python"):
     # For a new line, just keep the same indentation as the current line
     return current_indent
 
+# File extension to language identifier
+_LANGUAGE_MAP = {
+    'py': 'python',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'html': 'html',
+    'xml': 'xml',
+    'java': 'java',
+    'c': 'c',
+    'cpp': 'cpp',
+    'cc': 'cpp',
+    'h': 'c',
+    'hpp': 'cpp',
+    'cs': 'csharp',
+    'php': 'php',
+    'rb': 'ruby',
+    'pl': 'perl',
+    'sh': 'shell',
+    'bash': 'shell',
+    'zsh': 'shell',
+    'json': 'json',
+    'md': 'markdown',
+    'css': 'css',
+    'scss': 'scss',
+    'less': 'less',
+    'sql': 'sql',
+    'yaml': 'yaml',
+    'yml': 'yaml',
+    'go': 'go',
+    'rs': 'rust',
+}
+
 def get_language_from_filename(filename):
     """
     Determine the language based on file extension.
@@ -142,40 +250,11 @@ def get_language_from_filename(filename):
     if not filename:
         return "text"
         
-    extension = filename.split('.')[-1].lower() if '.' in filename else ''
-    
-    language_map = {
-        'py': 'python',
-        'js': 'javascript',
-        'ts': 'typescript',
-        'html': 'html',
-        'xml': 'xml',
-        'java': 'java',
-        'c': 'c',
-        'cpp': 'cpp',
-        'cc': 'cpp',
-        'h': 'c',
-        'hpp': 'cpp',
-        'cs': 'csharp',
-        'php': 'php',
-        'rb': 'ruby',
-        'pl': 'perl',
-        'sh': 'shell',
-        'bash': 'shell',
-        'zsh': 'shell',
-        'json': 'json',
-        'md': 'markdown',
-        'css': 'css',
-        'scss': 'scss',
-        'less': 'less',
-        'sql': 'sql',
-        'yaml': 'yaml',
-        'yml': 'yaml',
-        'go': 'go',
-        'rs': 'rust',
-    }
-    
-    return language_map.get(extension, 'text')
+    _, dot, extension = filename.rpartition('.')
+    if not dot:
+        return 'text'
+    
+    return _LANGUAGE_MAP.get(extension.lower(), 'text')
 
 def apply_auto_indent(buffer, event):
     """
@@ -192,12 +271,28 @@ def apply_auto_indent(buffer, event):
     text = buffer.text
     cursor_position = buffer.cursor_position
     
-    # Determine the language for the current file
+    # Determine the language for the current file, cached on the buffer
+    # until its filename changes
     filename = getattr(buffer, 'filename', None)
-    language = get_language_from_filename(filename) if filename else 'text'
+    language_cache = getattr(buffer, '_auto_indent_language', None)
+    if language_cache is not None and language_cache[0] == filename:
+        language = language_cache[1]
+    else:
+        language = get_language_from_filename(filename) if filename else 'text'
+        buffer._auto_indent_language = (filename, language)
+    
+    # Reuse the buffer's indentation style unless the file changed or the
+    # text has changed size considerably since it was detected
+    indent_cache = getattr(buffer, '_auto_indent_str', None)
+    if (indent_cache is not None and indent_cache[0] == filename
+            and abs(len(text) - indent_cache[1]) < INDENT_REDETECT_THRESHOLD):
+        indent_str = indent_cache[2]
+    else:
+        indent_str = get_indent_size(text)
+        buffer._auto_indent_str = (filename, len(text), indent_str)
     
     # Get the appropriate indentation
-    indent = get_smart_indent(text, cursor_position, language)
+    indent = get_smart_indent(text, cursor_position, language, indent_str)
     
     # Insert a new line with proper indentation
     buffer.insert_text('\n' + indent)
@@ -3,106 +3,346 @@ Configuration Manager - Handles loading, saving, and accessing user configuratio
 """
 
 import os
+import copy
 import json
 import logging
+import tempfile
+from functools import cache, lru_cache
 from pathlib import Path
+from stat import S_IMODE
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Union, Callable
 
+from utils import json_from_bytes, json_to_bytes
+
+try:
+    # msgpack is optional; with it, parsed configuration files are cached in a
+    # binary form that loads faster than the JSON source
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration schema with validation rules
+#
+# Entries declare their constraints the way JSON Schema does ("minimum",
+# "maximum", "min_length", "nullable"); the "validate" function of each entry
+# is compiled from them once at import time
 CONFIG_SCHEMA = {
     "theme": {
         "type": str,
         "default": "default",
-        "validate": lambda x: isinstance(x, str) and len(x) > 0,
+        "min_length": 1,
         "error_msg": "Theme must be a non-empty string"
     },
     "auto_save": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Auto-save must be a boolean value"
     },
     "auto_save_interval": {
         "type": int,
         "default": 30,
-        "validate": lambda x: isinstance(x, int) and 5 <= x <= 300,
+        "minimum": 5,
+        "maximum": 300,
         "error_msg": "Auto-save interval must be an integer between 5 and 300 seconds"
     },
     "line_numbers": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Line numbers setting must be a boolean value"
     },
     "wrap_lines": {
         "type": bool,
         "default": False,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Line wrapping must be a boolean value"
     },
     "tab_size": {
         "type": int,
         "default": 4,
-        "validate": lambda x: isinstance(x, int) and 1 <= x <= 8,
+        "minimum": 1,
+        "maximum": 8,
         "error_msg": "Tab size must be an integer between 1 and 8"
     },
     "use_spaces": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Use spaces setting must be a boolean value"
     },
     "syntax_check": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Syntax check setting must be a boolean value"
     },
     "show_insights": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Show insights setting must be a boolean value"
     },
     "terminal_height": {
         "type": int,
         "default": 8,
-        "validate": lambda x: isinstance(x, int) and 3 <= x <= 30,
+        "minimum": 3,
+        "maximum": 30,
         "error_msg": "Terminal height must be an integer between 3 and 30 rows"
     },
     "default_shell": {
         "type": str,
         "default": None,
-        "validate": lambda x: x is None or (isinstance(x, str) and len(x) > 0),
+        "nullable": True,
+        "min_length": 1,
         "error_msg": "Default shell must be a non-empty string or None"
     },
     "folding_enabled": {
         "type": bool,
         "default": True,
-        "validate": lambda x: isinstance(x, bool),
         "error_msg": "Code folding setting must be a boolean value"
     },
     "max_terminal_history": {
         "type": int,
         "default": 1000,
-        "validate": lambda x: isinstance(x, int) and 100 <= x <= 10000,
+        "minimum": 100,
+        "maximum": 10000,
         "error_msg": "Max terminal history must be an integer between 100 and 10000 lines"
     },
     "key_bindings": {
         "type": dict,
         "default": {},
-        "validate": lambda x: isinstance(x, dict),
         "error_msg": "Key bindings must be a dictionary"
     }
 }
 
+def _validation_source(schema):
+    """Get the Python expression that checks a value `v` against a schema entry
+    
+    Scalar types are checked by identity rather than isinstance(), which is
+    faster and keeps booleans out of integer settings.
+    
+    Args:
+        schema: A CONFIG_SCHEMA entry
+        
+    Returns:
+        The source of an expression that is true if `v` is valid
+    """
+    value_type = schema["type"]
+    type_name = value_type.__name__
+    
+    if value_type is bool:
+        expr = "(v is True or v is False)"
+    elif "minimum" in schema or "maximum" in schema:
+        bounds = "v"
+        if "minimum" in schema:
+            bounds = f"{schema['minimum']!r} <= {bounds}"
+        if "maximum" in schema:
+            bounds = f"{bounds} <= {schema['maximum']!r}"
+        expr = f"type(v) is {type_name} and {bounds}"
+    elif "min_length" in schema:
+        expr = f"type(v) is {type_name} and len(v) >= {schema['min_length']!r}"
+    elif value_type in (int, float, str):
+        expr = f"type(v) is {type_name}"
+    else:
+        expr = f"isinstance(v, {type_name})"
+    
+    if schema.get("nullable", False):
+        expr = f"v is None or ({expr})"
+    
+    return expr
+
+# Names the generated validation code can refer to
+_VALIDATION_NAMESPACE = {schema["type"].__name__: schema["type"] for schema in CONFIG_SCHEMA.values()}
+
+def _compile_validator(schema):
+    """Build a specialized validation function for a schema entry
+    
+    Args:
+        schema: A CONFIG_SCHEMA entry
+        
+    Returns:
+        A function taking a value and returning True if it is valid
+    """
+    namespace = dict(_VALIDATION_NAMESPACE)
+    exec(f"def validate(v):\n    return {_validation_source(schema)}\n", namespace)
+    return namespace["validate"]
+
+for _schema in CONFIG_SCHEMA.values():
+    _schema["validate"] = _compile_validator(_schema)
+    # Formats the validate_config() error for an invalid value
+    _error_msg = _schema["error_msg"].replace("{", "{{").replace("}", "}}")
+    _schema["_err_fmt"] = ("Invalid value: {}. " + _error_msg).format
+del _schema, _error_msg
+
+# The schema as parallel tuples indexed by position, used internally so
+# validation walks flat sequences instead of a dictionary per key
+_KEYS = tuple(CONFIG_SCHEMA.keys())
+_DEFAULTS = tuple(schema["default"] for schema in CONFIG_SCHEMA.values())
+_VALIDATORS = tuple(schema["validate"] for schema in CONFIG_SCHEMA.values())
+_ERR_MSGS = tuple(schema["error_msg"] for schema in CONFIG_SCHEMA.values())
+_ERR_FMTS = tuple(schema["_err_fmt"] for schema in CONFIG_SCHEMA.values())
+_KEY_TO_IDX = {key: i for i, key in enumerate(_KEYS)}
+
+# Marks a missing entry in lookups where None is a valid value
+_MISSING = object()
+
+def _compile_validate_all():
+    """Build a function validating every schema key of a configuration
+    
+    The checks of all keys are inlined into one straight-line function, so
+    validating a whole configuration involves no loop or per-key call.
+    
+    Returns:
+        A function taking a configuration dictionary and returning a
+        dictionary of error messages keyed by the invalid keys
+    """
+    lines = ["def _validate_all(c):", "    e = {}"]
+    for i, (key, schema) in enumerate(CONFIG_SCHEMA.items()):
+        lines.append(f"    v = c.get({key!r}, _MISSING)")
+        lines.append(f"    if v is not _MISSING and not ({_validation_source(schema)}):")
+        lines.append(f"        e[{key!r}] = _ERR_FMTS[{i}](v)")
+    lines.append("    return e")
+    
+    namespace = dict(_VALIDATION_NAMESPACE, _MISSING=_MISSING, _ERR_FMTS=_ERR_FMTS)
+    exec("\n".join(lines) + "\n", namespace)
+    return namespace["_validate_all"]
+
+_validate_all = _compile_validate_all()
+
+
+# Unknown configuration keys that have already been warned about
+_UNKNOWN_KEYS_CACHE = set()
+
 # Build default config from schema
 DEFAULT_CONFIG = {key: schema["default"] for key, schema in CONFIG_SCHEMA.items()}
 
+_DEFAULT_PAIRS = tuple(DEFAULT_CONFIG.items())
+_MUTABLE_DEFAULT_KEYS = tuple(key for key, value in _DEFAULT_PAIRS if isinstance(value, (dict, list)))
+
+def _make_default_config():
+    """Build a fresh default configuration
+    
+    Mutable defaults (such as key_bindings) are copied so configurations
+    never share them with each other or with the schema.
+    """
+    config = dict(_DEFAULT_PAIRS)
+    for key in _MUTABLE_DEFAULT_KEYS:
+        config[key] = config[key].copy()
+    return config
+
+# Default location of the configuration file in the user's home directory
+_DEFAULT_CONFIG_PATH = os.path.join(str(Path.home()), ".text_shell_editor", "config.json")
+
+# Parsed configuration files keyed by path, as ((mtime_ns, size), config,
+# contents) tuples, so loading an unchanged file again skips parsing it
+# (contents is None when the file was read from its binary cache)
+_PARSE_CACHE = {}
+
+@lru_cache(maxsize=256)
+def _split_key(key):
+    """Split a dot-notation configuration key into its parts"""
+    return tuple(key.split('.')) if '.' in key else (key,)
+
+def _file_signature(path):
+    """Get the (mtime_ns, size) of a file, or None if it can't be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _fsync_directory(path):
+    """Flush a directory entry to disk so a rename in it survives a crash"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        # Directories can't be opened for syncing on Windows
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _read_umask():
+    """Get the process umask
+    
+    Reading it means setting it, so this is only done once at import,
+    before other threads could create files with the wrong permissions.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Permissions of a newly created file
+_NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+def _replacement_mode(path):
+    """Get the permissions for a file written in place of path
+    
+    Keeps the mode of an existing file, and otherwise uses the mode a newly
+    created file would get from the umask.
+    """
+    try:
+        return S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return _NEW_FILE_MODE
+
+def _binary_cache_path(path):
+    """Get the path of the binary cache kept alongside a configuration file"""
+    return f"{path}.mpk"
+
+def _read_binary_cache(path, signature):
+    """Read the parsed contents of a configuration file from its binary cache
+    
+    Args:
+        path: Path of the JSON configuration file
+        signature: (mtime_ns, size) of the configuration file
+        
+    Returns:
+        The configuration dictionary, or None if there is no up-to-date cache
+    """
+    if msgpack is None:
+        return None
+    try:
+        with open(_binary_cache_path(path), 'rb') as f:
+            mtime_ns, size, config = msgpack.unpackb(f.read(), raw=False)
+    except Exception:
+        return None
+    
+    # The cache records the signature of the file it was made from, so any
+    # change to the JSON source invalidates it
+    if (mtime_ns, size) != signature or not isinstance(config, dict):
+        return None
+    return config
+
+def _write_binary_cache(path, signature, config):
+    """Write the binary cache of a configuration file
+    
+    The cache is only an optimization, so failing to write it is not an error.
+    
+    Args:
+        path: Path of the JSON configuration file
+        signature: (mtime_ns, size) of the configuration file
+        config: The configuration dictionary the file holds
+    """
+    if msgpack is None or signature is None:
+        return
+    cache_path = _binary_cache_path(path)
+    temp_path = f"{cache_path}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(msgpack.packb([signature[0], signature[1], config], use_bin_type=True))
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        logger.debug("Could not write configuration cache %s: %s", cache_path, e)
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
 class ConfigManager:
     """Manages editor configuration"""
     
@@ -114,48 +354,76 @@ class ConfigManager:
         """
         if config_path is None:
             # Use default location in user home directory
-            self.config_path = os.path.join(
-                str(Path.home()), 
-                ".text_shell_editor", 
-                "config.json"
-            )
+            self.config_path = _DEFAULT_CONFIG_PATH
         else:
             self.config_path = config_path
             
         # Initialize with default configuration
-        self.config = DEFAULT_CONFIG.copy()
+        self.config = _make_default_config()
+        self._rebuild_flat()
+        
+        # (path, contents, (mtime_ns, size)) of the file last written, or
+        # loaded with contents matching the configuration, to skip no-op saves
+        self._last_saved = None
         
         # Try to load from file
         self.load()
     
     def load(self):
         """Load configuration from file"""
-        if not os.path.exists(self.config_path):
-            logger.info("No configuration file found, using defaults")
-            return False
-            
         try:
-            with open(self.config_path, 'r') as f:
-                user_config = json.load(f)
-            
-            # Validate config format
-            if not isinstance(user_config, dict):
-                logger.error(f"Invalid configuration format in {self.config_path}, using defaults")
-                return False
+            # The file is small, so read it in one call on a raw descriptor
+            # rather than through a buffered file object
+            fd = os.open(self.config_path, os.O_RDONLY)
+            try:
+                # Reuse the parsed file if it hasn't changed since it was last read
+                stat = os.fstat(fd)
+                cache_key = (stat.st_mtime_ns, stat.st_size)
+                cached = _PARSE_CACHE.get(self.config_path)
+                if cached is not None and cached[0] == cache_key:
+                    user_config = copy.deepcopy(cached[1])
+                    data = cached[2]
+                else:
+                    # Prefer the binary cache of the file over parsing its JSON
+                    data = None
+                    user_config = _read_binary_cache(self.config_path, cache_key)
+                    if user_config is None:
+                        data = os.read(fd, stat.st_size)
+                        user_config = json_from_bytes(data)
+                        
+                        # Validate config format
+                        if not isinstance(user_config, dict):
+                            logger.error("Invalid configuration format in %s, using defaults", self.config_path)
+                            return False
+                        
+                        _write_binary_cache(self.config_path, cache_key, user_config)
+                    
+                    _PARSE_CACHE[self.config_path] = (cache_key, copy.deepcopy(user_config), data)
+            finally:
+                os.close(fd)
                 
             # Update config with user settings
             self.merge_config(user_config)
-            logger.info(f"Configuration loaded from {self.config_path}")
+            
+            # If the file already holds exactly this configuration, saving it
+            # again can be skipped (unknown when it was read from the cache)
+            if data is not None and json_to_bytes(self.config) == data:
+                self._last_saved = (self.config_path, data, cache_key)
+                
+            logger.info("Configuration loaded from %s", self.config_path)
             return True
+        except FileNotFoundError:
+            logger.info("No configuration file found, using defaults")
+            return False
         except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in configuration file: {str(e)}")
-            logger.error(f"Using default configuration instead")
+            logger.error("Invalid JSON in configuration file: %s", e)
+            logger.error("Using default configuration instead")
             return False
         except PermissionError:
-            logger.error(f"Permission denied when accessing {self.config_path}")
+            logger.error("Permission denied when accessing %s", self.config_path)
             return False
         except Exception as e:
-            logger.error(f"Error loading configuration: {str(e)}")
+            logger.error("Error loading configuration: %s", e)
             return False
     
     def save(self):
@@ -177,41 +445,69 @@ class ConfigManager:
             return False
             
         try:
+            data = json_to_bytes(self.config)
+            
+            # Nothing to do if the file still holds exactly this configuration
+            if self._last_saved is not None:
+                saved_path, saved_data, saved_signature = self._last_saved
+                if saved_path == path and saved_data == data and _file_signature(path) == saved_signature:
+                    return True
+            
             # Ensure directory exists
             config_dir = os.path.dirname(path)
             if config_dir:  # Only create if there's a directory component
                 try:
                     os.makedirs(config_dir, exist_ok=True)
                 except PermissionError:
-                    logger.error(f"Permission denied when creating directory {config_dir}")
+                    logger.error("Permission denied when creating directory %s", config_dir)
                     return False
                 except OSError as e:
-                    logger.error(f"OS error when creating config directory: {str(e)}")
+                    logger.error("OS error when creating config directory: %s", e)
                     return False
             
-            # Check if file exists and is writable before attempting write
-            if os.path.exists(path) and not os.access(path, os.W_OK):
-                logger.error(f"Configuration file exists but is not writable: {path}")
-                return False
-                
-            # Write to a temporary file first, then rename to avoid corruption
-            temp_path = f"{path}.tmp"
-            with open(temp_path, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            # Write to a temporary file first, flushed to disk, then rename it
+            # over the config file so a crash never leaves it half-written
+            with tempfile.NamedTemporaryFile('wb', delete=False, dir=config_dir or '.',
+                                             prefix='.cfg_', suffix='.tmp') as f:
+                temp_path = f.name
+                try:
+                    # NamedTemporaryFile creates the file 0600, so give it the
+                    # permissions the config file has (or would have)
+                    if hasattr(os, 'fchmod'):
+                        os.fchmod(f.fileno(), _replacement_mode(path))
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                except BaseException:
+                    f.close()
+                    os.unlink(temp_path)
+                    raise
                 
             # Rename the temp file to the actual config file
-            os.replace(temp_path, path)
+            try:
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            _fsync_directory(config_dir or '.')
+            _PARSE_CACHE.pop(path, None)
+            signature = _file_signature(path)
+            self._last_saved = (path, data, signature)
+            if path == self.config_path:
+                # Only the editor's own configuration is loaded again, so
+                # exports to other files don't get a cache next to them
+                _write_binary_cache(path, signature, self.config)
             
-            logger.info(f"Configuration saved to {path}")
+            logger.info("Configuration saved to %s", path)
             return True
         except PermissionError:
-            logger.error(f"Permission denied when writing to {path}")
+            logger.error("Permission denied when writing to %s", path)
             return False
         except IOError as e:
-            logger.error(f"I/O error when saving configuration: {str(e)}")
+            logger.error("I/O error when saving configuration: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error saving configuration: {str(e)}")
+            logger.error("Error saving configuration: %s", e)
             return False
     
     def merge_config(self, user_config):
@@ -224,29 +520,44 @@ class ConfigManager:
         Args:
             user_config: User configuration dictionary
         """
-        def merge_dicts(default_dict, user_dict):
-            """Recursively merge dictionaries"""
-            result = default_dict.copy()
+        def merge_into(config, user_dict):
+            """Recursively merge a dictionary into the configuration in place"""
             for k, v in user_dict.items():
-                if k in result and isinstance(result[k], dict) and isinstance(v, dict):
+                current = config.get(k)
+                if isinstance(current, dict) and isinstance(v, dict):
                     # Both values are dicts, merge them recursively
-                    result[k] = merge_dicts(result[k], v)
+                    merge_into(current, v)
+                elif (i := _KEY_TO_IDX.get(k)) is not None and not _VALIDATORS[i](v):
+                    # Invalid value, use default
+                    default = _DEFAULTS[i]
+                    logger.warning("Invalid configuration value for '%s': %s. %s. Using default: %s",
+                                   k, v, _ERR_MSGS[i], default)
+                    config[k] = copy.copy(default)
                 else:
-                    # Either key is not in result, or value types don't match
-                    # In either case, validate the user value before using it
-                    if k in CONFIG_SCHEMA and not self._validate_value(k, v):
-                        # Invalid value, use default
-                        logger.warning(f"Invalid configuration value for '{k}': {v}. "
-                                      f"{CONFIG_SCHEMA[k]['error_msg']}. "
-                                      f"Using default: {CONFIG_SCHEMA[k]['default']}")
-                        result[k] = CONFIG_SCHEMA[k]['default']
-                    else:
-                        # Value is valid or not in schema, use as is
-                        result[k] = v
-            return result
-        
-        # Merge user config with defaults, validating as we go
-        self.config = merge_dicts(self.config, user_config)
+                    # Value is valid or not in schema, use as is
+                    config[k] = v
+        
+        # Merge user config into the current configuration, validating as we go
+        merge_into(self.config, user_config)
+        self._rebuild_flat()
+        
+    def _rebuild_flat(self):
+        """Rebuild the index of every value in the configuration by its dot-notation key
+        
+        Nested dictionaries are indexed both as values and by their own keys,
+        so get() is a single dictionary lookup for any key that exists.
+        """
+        flat = {}
+        
+        def add_entries(prefix, config):
+            for k, v in config.items():
+                path = f"{prefix}{k}"
+                flat[path] = v
+                if isinstance(v, dict):
+                    add_entries(f"{path}.", v)
+        
+        add_entries("", self.config)
+        self._flat = flat
         
     def _validate_value(self, key, value):
         """Validate a configuration value against the schema
@@ -258,12 +569,12 @@ class ConfigManager:
         Returns:
             True if the value is valid, False otherwise
         """
-        if key not in CONFIG_SCHEMA:
+        i = _KEY_TO_IDX.get(key)
+        if i is None:
             # Key not in schema, can't validate
             return True
         
-        # Use the validate function from the schema
-        return CONFIG_SCHEMA[key]['validate'](value)
+        return _VALIDATORS[i](value)
     
     def get(self, key, default=None):
         """Get a configuration value by key
@@ -275,15 +586,31 @@ class ConfigManager:
         Returns:
             The configuration value or default
         """
-        keys = key.split('.')
+        flat = self._flat
+        if flat is None:
+            self._rebuild_flat()
+            flat = self._flat
+        
+        value = flat.get(key, _MISSING)
+        if value is not _MISSING:
+            if isinstance(value, dict):
+                # Hand out a copy, so changing it can't leave the index stale
+                return copy.deepcopy(value)
+            return value
+        
+        # Not indexed, fall back to walking the configuration
+        keys = _split_key(key)
+        if len(keys) == 1:
+            return self.config.get(key, default)
+        
         value = self.config
         
         try:
             for k in keys:
                 value = value[k]
-            return value
         except (KeyError, TypeError):
             return default
+        return copy.deepcopy(value) if isinstance(value, dict) else value
     
     def set(self, key, value):
         """Set a configuration value
@@ -295,23 +622,37 @@ class ConfigManager:
         Returns:
             True if successful, False otherwise
         """
-        keys = key.split('.')
+        # Fast path for top-level keys, the common case
+        if key and '.' not in key:
+            i = _KEY_TO_IDX.get(key)
+            if i is not None and not _VALIDATORS[i](value):
+                logger.error("Invalid value for %s: %s. %s", key, value, _ERR_MSGS[i])
+                return False
+            
+            previous_value = self.config.get(key)
+            if isinstance(value, dict) or isinstance(previous_value, dict):
+                # Keep a copy, so the caller changing its dict can't leave the index stale
+                value = copy.deepcopy(value)
+                self.config[key] = value
+                self._rebuild_flat()
+            else:
+                self.config[key] = value
+                if self._flat is not None:
+                    self._flat[key] = value
+            
+            # Log the change if it's different
+            if previous_value != value:
+                logger.info("Configuration updated: %s = %s", key, value)
+            return True
+        
+        keys = _split_key(key)
         config = self.config
         
         # Validate key format
         if not keys or any(not k for k in keys):
-            logger.error(f"Invalid configuration key: {key}")
+            logger.error("Invalid configuration key: %s", key)
             return False
             
-        # Get the main key (top-level key)
-        main_key = keys[0]
-            
-        # Validate the value if it's a top-level key in our schema
-        if len(keys) == 1 and main_key in CONFIG_SCHEMA:
-            if not self._validate_value(main_key, value):
-                logger.error(f"Invalid value for {main_key}: {value}. {CONFIG_SCHEMA[main_key]['error_msg']}")
-                return False
-                
         # Capture previous value for change notification
         previous_value = self.get(key)
         
@@ -322,30 +663,43 @@ class ConfigManager:
                     config[k] = {}
                 config = config[k]
             
-            # Set the final key
+            # Set the final key, keeping a copy of dicts like the fast path
+            if isinstance(value, dict):
+                value = copy.deepcopy(value)
             config[keys[-1]] = value
+            self._rebuild_flat()
             
             # Log the change if it's different
             if previous_value != value:
-                logger.info(f"Configuration updated: {key} = {value}")
+                logger.info("Configuration updated: %s = %s", key, value)
                 
             return True
         except Exception as e:
-            logger.error(f"Error setting configuration value: {str(e)}")
+            logger.error("Error setting configuration value: %s", e)
             return False
     
     def reset_to_defaults(self):
         """Reset configuration to default values"""
-        self.config = DEFAULT_CONFIG.copy()
+        self.config = _make_default_config()
+        self._rebuild_flat()
         return self.save()
     
-    def get_all(self):
+    def get_all(self, copy=False):
         """Get all configuration values
         
+        Args:
+            copy: Return a copy that can be modified instead of a read-only view
+            
         Returns:
-            A copy of the entire configuration dictionary
+            A read-only view of the entire configuration dictionary, or a copy
+            of it if requested
         """
-        return self.config.copy()
+        if copy:
+            return self.config.copy()
+        # Nested dictionaries in the view are the live ones, so rebuild the
+        # index on the next get() in case they're changed through it
+        self._flat = None
+        return MappingProxyType(self.config)
         
     def validate_config(self):
         """Validate the entire configuration against the schema
@@ -355,43 +709,44 @@ class ConfigManager:
             the configuration is valid, and errors is a dictionary of error messages
             keyed by the config key.
         """
-        errors = {}
-        
         # Check each top-level key in the schema
-        for key, schema in CONFIG_SCHEMA.items():
-            if key in self.config:
-                value = self.config[key]
-                if not self._validate_value(key, value):
-                    errors[key] = f"Invalid value: {value}. {schema['error_msg']}"
-        
-        # Also look for unknown keys that might be typos
-        for key in self.config:
-            if key not in CONFIG_SCHEMA:
-                # This is not an error, just a warning
-                logger.warning(f"Unknown configuration key: {key}")
+        errors = _validate_all(self.config)
+        
+        # Also look for unknown keys that might be typos, warning once per key
+        unknown = self.config.keys() - CONFIG_SCHEMA.keys() - _UNKNOWN_KEYS_CACHE
+        _UNKNOWN_KEYS_CACHE.update(unknown)
+        for key in unknown:
+            # This is not an error, just a warning
+            logger.warning("Unknown configuration key: %s", key)
         
         is_valid = len(errors) == 0
         return is_valid, errors
 
 
-# Singleton instance
-_instance = None
+@cache
+def _get_config_for_path(config_path):
+    """Get the configuration manager for a config file, creating it once"""
+    return ConfigManager(config_path)
 
 def get_config(config_path=None):
     """Get the configuration manager instance
     
-    This function ensures only one instance exists.
+    This function ensures only one instance exists per configuration file.
     
     Args:
-        config_path: Optional path to config file
+        config_path: Optional path to config file, the default location if
+            not given
         
     Returns:
         A ConfigManager instance
     """
-    global _instance
-    if _instance is None:
-        _instance = ConfigManager(config_path)
-    return _instance
+    if config_path is None:
+        config_path = _DEFAULT_CONFIG_PATH
+    return _get_config_for_path(config_path)
+
+def clear_config_cache():
+    """Forget every configuration manager instance, e.g. to reload them from disk"""
+    _get_config_for_path.cache_clear()
 
 
 def load_command_line_config(args):
@@ -403,7 +758,8 @@ def load_command_line_config(args):
     Returns:
         Updated configuration dictionary
     """
-    config = get_config()
+    # Apply the arguments to the configuration the editor was started with
+    config = get_config(getattr(args, 'config', None))
     
     # Dictionary mapping arg names to config keys and validation functions
     arg_mappings = {
@@ -463,18 +819,23 @@ def load_command_line_config(args):
         }
     }
     
-    # Process each supported argument
+    # Collect each supported argument, then apply them all at once
+    updates = {}
     for arg_name, mapping in arg_mappings.items():
         if hasattr(args, arg_name) and getattr(args, arg_name) is not None:
             value = getattr(args, arg_name)
             
             # Validate the argument value
             if mapping['validate'](value):
-                logger.debug(f"Setting {mapping['config_key']} to {value} from command line")
-                config.set(mapping['config_key'], value)
+                logger.debug("Setting %s to %s from command line", mapping['config_key'], value)
+                updates[mapping['config_key']] = value
             else:
-                logger.warning(f"{mapping['error_msg']}. Using default: {mapping['default']}")
-                config.set(mapping['config_key'], mapping['default'])
+                logger.warning("%s. Using default: %s", mapping['error_msg'], mapping['default'])
+                updates[mapping['config_key']] = mapping['default']
+    
+    if updates:
+        config.merge_config(updates)
+        logger.info("Configuration updated from command line: %s", ', '.join(updates))
     
     # Handle special case for edit-config
     if hasattr(args, 'edit_config') and args.edit_config:
@@ -7,8 +7,11 @@ import re
 import sys
 import threading
 import time
+from functools import lru_cache
 
-def get_fragment_line(fragment, transformation_input):
+import prompt_toolkit
+
+def _get_fragment_line_compat(fragment, transformation_input):
     """
     Get the line number for a fragment in a compatible way.
     In pt 3.0.43, fragments are tuples, not objects with a 'line' attribute.
@@ -19,6 +22,19 @@ def get_fragment_line(fragment, transformation_input):
         return transformation_input.lineno
     # For older versions where fragments have a line attribute
     return fragment.line
+
+def _get_fragment_line_tuple(fragment, transformation_input):
+    """Get the line number for a fragment, which in pt 3.x is a plain tuple"""
+    return transformation_input.lineno
+
+# Processors look up the line of every fragment they render, so pick the
+# implementation for the installed prompt-toolkit once instead of probing
+# each fragment
+if int(prompt_toolkit.__version__.split('.')[0]) >= 3:
+    get_fragment_line = _get_fragment_line_tuple
+else:
+    get_fragment_line = _get_fragment_line_compat
+
 # Import AI context module
 import ai_context
 # Import auto-indent functionality
@@ -29,6 +45,7 @@ import syntax_checker
 import syntax_styles
 # Import snippets
 import snippets
+from utils import get_file_extension
 # Import correct prompt_toolkit modules
 # Handle different prompt_toolkit versions
 try:
@@ -73,17 +90,137 @@ except ImportError:
 from pygments.lexers import get_lexer_for_filename, TextLexer
 from pygments.util import ClassNotFound
 
+# Seconds without a new request before a syntax check runs
+SYNTAX_CHECK_DEBOUNCE = 0.3
+
+# Map of file extensions to the language identifiers snippets are filed under
+_EXT_LANGUAGE_MAP = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.html': 'html',
+    '.css': 'css',
+    '.java': 'java',
+    '.c': 'c',
+    '.cpp': 'cpp',
+    '.h': 'c',
+    '.hpp': 'cpp',
+    '.go': 'go',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.rs': 'rust',
+    '.sh': 'shell',
+    '.md': 'markdown',
+    '.xml': 'xml',
+    '.json': 'json',
+    '.sql': 'sql',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+}
+
+# Word right before the cursor, a potential snippet trigger
+_TRAILING_WORD_RE = re.compile(r'\w+\Z')
+
+@lru_cache(maxsize=256)
+def _matching_snippets(language, prefix):
+    """Get the standard snippets matching a prefix, cached while typing a word"""
+    return tuple(snippets.get_snippet_manager().get_matching_snippets(language, prefix))
+
+@lru_cache(maxsize=256)
+def _matching_ai_snippets(language, prefix):
+    """Get the AI-generated snippets matching a prefix, cached while typing a word"""
+    import ai_snippets
+    return tuple(ai_snippets.get_ai_snippet_generator().get_matching_snippets(language, prefix))
+
+# Micro animations instance, set on first use since micro_animations imports
+# this module
+_micro_animations = None
+
+def _get_micro_animations():
+    """Get the micro animations instance, importing the module the first time"""
+    global _micro_animations
+    if _micro_animations is None:
+        import micro_animations
+        _micro_animations = micro_animations.get_micro_animations()
+    return _micro_animations
+
+def clear_snippet_cache():
+    """Forget cached snippet matches, e.g. after a snippet was added"""
+    _matching_snippets.cache_clear()
+    _matching_ai_snippets.cache_clear()
+
+def _changed_line_range(old_lines, new_lines):
+    """Get the range of lines that differ between two versions of a text
+    
+    Returns:
+        Tuple (start_line, end_line) of the changed lines in the new text,
+        1-based and inclusive
+    """
+    common = min(len(old_lines), len(new_lines))
+    
+    prefix = 0
+    while prefix < common and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+        
+    suffix = 0
+    while suffix < common - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+        
+    start_line = prefix + 1
+    return start_line, max(len(new_lines) - suffix, start_line)
+
+def _plural(n, word):
+    """Format a count with a word, pluralised unless the count is 1"""
+    return f"{n} {word}" if n == 1 else f"{n} {word}s"
+
+class _ToggleState:
+    """Animation target of a toggle's (or fold's) highlight effect"""
+    __slots__ = ('highlight',)
+    
+    def __init__(self):
+        self.highlight = 0.0
+
+class _SearchResultState:
+    """Animation target of a search result's highlight"""
+    __slots__ = ('highlight_intensity', 'scale')
+    
+    def __init__(self):
+        self.highlight_intensity = 0.5
+        self.scale = 1.0
+
 class EditorTab:
     """Represents a single editor tab"""
+    __slots__ = ('filename', 'buffer', 'modified', 'lexer', 'checked_lines')
+    
     def __init__(self, filename=None, buffer=None):
         self.filename = filename
         self.buffer = buffer or Buffer()
         self.modified = False
         self.lexer = None  # Will be set after get_lexer_for_file is defined
+        self.checked_lines = None  # Lines of the text last sent for a syntax check
         # File loading will be done after initialization
 
 class EditorState:
     """Global state for the editor application"""
+    __slots__ = (
+        'tabs', 'active_tab_index', 'status_message', 'status_type', 'editor_mode',
+        'show_terminal', 'show_insights', 'analyzing_code', 'current_insight',
+        'wrap_lines', 'line_numbers',
+        'search_query', 'search_results', 'current_search_index', 'replace_text',
+        'show_search_ui', 'search_result_states',
+        'auto_save_enabled', 'auto_save_interval', 'last_save_time',
+        'syntax_check_enabled', 'check_on_save', 'syntax_errors',
+        '_pending_syntax_timer', '_last_checked_hash',
+        'folding_enabled', 'folded_regions',
+        'terminal_height', 'terminal_width', 'ui_size_category',
+        'tab_size', 'use_spaces',
+        'current_theme', 'theme_transition_progress',
+        'enable_animations', 'completion', 'tab_animation', 'tooltips',
+        'button_states', 'toggle_states', 'panel_focus_states', 'notification_states',
+        'insights_panel_opacity', 'search_panel_opacity', 'terminal_panel_opacity',
+        'refresh_required',
+    )
+    
     def __init__(self):
         self.tabs = []
         self.active_tab_index = 0
@@ -103,6 +240,7 @@ class EditorState:
         self.current_search_index = 0
         self.replace_text = ""
         self.show_search_ui = False
+        self.search_result_states = {}  # Animation states of search results
         
         # Auto-save functionality
         self.auto_save_enabled = True
@@ -113,6 +251,8 @@ class EditorState:
         self.syntax_check_enabled = True  # Toggle for syntax checking
         self.check_on_save = True  # Check syntax when saving
         self.syntax_errors = {}  # Map of filenames to lists of syntax errors
+        self._pending_syntax_timer = None  # Debounce timer of the next syntax check
+        self._last_checked_hash = {}  # Map of filenames to the hash of the text last checked
         
         # Code folding
         self.folding_enabled = True  # Toggle for code folding
@@ -120,6 +260,8 @@ class EditorState:
         
         # Terminal configuration
         self.terminal_height = 8  # rows
+        self.terminal_width = None  # columns, set once the layout is created
+        self.ui_size_category = None  # Set once the layout is created
         
         # Indentation settings
         self.tab_size = 4  
@@ -127,6 +269,7 @@ class EditorState:
         
         # Theme settings
         self.current_theme = 'dracula'  # Default theme
+        self.theme_transition_progress = 0.0  # Progress of the theme change animation
         
         # Animation settings
         self.enable_animations = True  # Toggle for animation features
@@ -154,26 +297,26 @@ class EditorState:
         # Animation refresh flag
         self.refresh_required = False
         
+    def _run_toggle_animation(self, toggle_id, value):
+        """Animate the toggle effect of a setting that was switched on or off"""
+        if not self.enable_animations:
+            return
+            
+        # Create a toggle state object if it doesn't exist
+        toggle_state = self.toggle_states.get(toggle_id)
+        if toggle_state is None:
+            toggle_state = self.toggle_states[toggle_id] = _ToggleState()
+            
+        _get_micro_animations().animate_toggle(toggle_state, value)
+        
     def toggle_syntax_check(self):
         """Toggle syntax checking functionality"""
         # Toggle the state
         self.syntax_check_enabled = not self.syntax_check_enabled
         
-        # Import micro_animations here to avoid circular imports
-        if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "syntax_check"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.syntax_check_enabled
-            )
-            
+        # Animate the toggle effect
+        self._run_toggle_animation("syntax_check", self.syntax_check_enabled)
+        
         # If enabled, trigger a check of the current file
         if self.syntax_check_enabled:
             self.check_current_file_syntax()
@@ -193,30 +336,65 @@ class EditorState:
         if not active_tab or not active_tab.buffer:
             return False
             
-        # Get the text and request a syntax check
-        text = active_tab.buffer.text
-        syntax_checker.request_syntax_check(text, active_tab.filename)
+        filename = active_tab.filename
+        buffer = active_tab.buffer
         
         # Schedule retrieval of results after a delay
         def retrieve_syntax_results():
-            filename = active_tab.filename
-            self.syntax_errors[filename] = syntax_checker.get_syntax_errors(filename)
+            errors = syntax_checker.get_syntax_errors(filename)
+            self.syntax_errors[filename] = errors
             
-            if self.syntax_errors[filename]:
-                error_count = len(self.syntax_errors[filename])
-                self.status_message = f"Found {error_count} syntax/style issue{'s' if error_count != 1 else ''}"
+            if errors:
+                self.status_message = f"Found {_plural(len(errors), 'syntax/style issue')}"
                 self.status_type = "error"
             else:
                 self.status_message = "No syntax issues found"
                 self.status_type = "info"
         
-        # Start a thread to retrieve results after a short delay
-        threading.Timer(0.5, retrieve_syntax_results).start()
+        def run_syntax_check():
+            # Only re-check the text if it changed since the last check
+            text = buffer.text
+            text_hash = hash(text)
+            if self._last_checked_hash.get(filename) == text_hash:
+                retrieve_syntax_results()
+                return
+            self._last_checked_hash[filename] = text_hash
+            
+            # After the first check, only the lines that changed since the
+            # previous one need their style re-checked. Line endings are kept
+            # so adding or removing the final newline changes the last line.
+            # Results are kept per filename, so untitled tabs are always
+            # checked in full rather than against another tab's results.
+            lines = text.splitlines(True)
+            previous_lines = active_tab.checked_lines
+            active_tab.checked_lines = lines
+            if previous_lines is None or filename is None:
+                syntax_checker.request_syntax_check(text, filename)
+            else:
+                start_line, end_line = _changed_line_range(previous_lines, lines)
+                syntax_checker.request_syntax_check_range(text, filename, start_line, end_line,
+                                                          len(lines) - len(previous_lines))
+            
+            # Start a thread to retrieve results after a short delay
+            timer = threading.Timer(0.5, retrieve_syntax_results)
+            timer.daemon = True
+            self._pending_syntax_timer = timer
+            timer.start()
+        
+        # Debounce rapid calls (e.g. while typing), so only the last call
+        # within the window actually runs a check
+        if self._pending_syntax_timer is not None:
+            self._pending_syntax_timer.cancel()
+        timer = threading.Timer(SYNTAX_CHECK_DEBOUNCE, run_syntax_check)
+        timer.daemon = True
+        self._pending_syntax_timer = timer
+        timer.start()
         
         return True
 
     def add_tab(self, filename=None):
         """Add a new tab and make it active"""
+        clear_snippet_cache()
         new_tab = EditorTab(filename=filename)
         self.tabs.append(new_tab)
         self.active_tab_index = len(self.tabs) - 1
@@ -246,6 +424,10 @@ class EditorState:
         """Switch to the tab at the given index"""
         if 0 <= index < len(self.tabs):
             old_index = self.active_tab_index
+            if index == old_index:
+                # Already active, nothing to animate
+                return True
+                
             self.active_tab_index = index
             
             # Start tab transition animation
@@ -265,39 +447,17 @@ class EditorState:
         # Toggle the state
         self.show_insights = not self.show_insights
         
-        # Import micro_animations here to avoid circular imports
+        # Animate the toggle effect
+        self._run_toggle_animation("insights_panel", self.show_insights)
+        
         if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "insights_panel"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.show_insights
-            )
-            
             # Animate panel opacity
             if self.show_insights:
                 # Start at 0 and animate to 1
                 self.insights_panel_opacity = 0.0
                 
                 # Create and start a fade-in animation
-                class PanelFadeIn(animations.AnimationState):
-                    def __init__(self, target):
-                        super().__init__()
-                        self.target = target
-                        self.duration = 0.25
-                        
-                    def on_frame(self):
-                        progress = self.get_eased_progress("ease_out_cubic")
-                        self.target.insights_panel_opacity = progress
-                        refresh_editor_view()
-                
-                fade_in = PanelFadeIn(self)
+                fade_in = PanelFadeIn(self, "insights_panel_opacity", 0.25)
                 animations.animation_manager.add_animation("insights_panel_fade", fade_in)
                 animations.animation_manager.start_animation("insights_panel_fade")
             
@@ -308,21 +468,9 @@ class EditorState:
         # Toggle the state
         self.wrap_lines = not self.wrap_lines
         
-        # Import micro_animations here to avoid circular imports
-        if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "line_wrap"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.wrap_lines
-            )
-            
+        # Animate the toggle effect
+        self._run_toggle_animation("line_wrap", self.wrap_lines)
+        
         return self.wrap_lines
         
     def toggle_line_numbers(self):
@@ -330,21 +478,9 @@ class EditorState:
         # Toggle the state
         self.line_numbers = not self.line_numbers
         
-        # Import micro_animations here to avoid circular imports
-        if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "line_numbers"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.line_numbers
-            )
-            
+        # Animate the toggle effect
+        self._run_toggle_animation("line_numbers", self.line_numbers)
+        
         return self.line_numbers
         
     def toggle_folding(self):
@@ -352,21 +488,9 @@ class EditorState:
         # Toggle the state
         self.folding_enabled = not self.folding_enabled
         
-        # Import micro_animations here to avoid circular imports
-        if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "folding"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.folding_enabled
-            )
-            
+        # Animate the toggle effect
+        self._run_toggle_animation("folding", self.folding_enabled)
+        
         return self.folding_enabled
         
     def show_code_completion(self, completions, position):
@@ -383,36 +507,9 @@ class EditorState:
         # Get current file to determine language for snippets
         active_tab = self.get_active_tab()
         if active_tab and active_tab.filename:
-            import os
-            from utils import get_file_extension
-            file_ext = get_file_extension(active_tab.filename)
-            
             # Map file extension to language identifier
-            language_map = {
-                '.py': 'python',
-                '.js': 'javascript',
-                '.ts': 'typescript',
-                '.html': 'html',
-                '.css': 'css',
-                '.java': 'java',
-                '.c': 'c',
-                '.cpp': 'cpp',
-                '.h': 'c',
-                '.hpp': 'cpp',
-                '.go': 'go',
-                '.rb': 'ruby',
-                '.php': 'php',
-                '.rs': 'rust',
-                '.sh': 'shell',
-                '.md': 'markdown',
-                '.xml': 'xml',
-                '.json': 'json',
-                '.sql': 'sql',
-                '.yaml': 'yaml',
-                '.yml': 'yaml',
-            }
-            
-            language = language_map.get(file_ext.lower(), 'text')
+            file_ext = get_file_extension(active_tab.filename)
+            language = _EXT_LANGUAGE_MAP.get(file_ext, 'text')
             
             # Get current line and cursor position to check for snippet triggers
             if active_tab.buffer:
@@ -425,35 +522,19 @@ class EditorState:
                 line_before_cursor = line[:document.cursor_position_col]
                 word_before_cursor = ''
                 
-                # Extract the last word before cursor (potential snippet trigger)
-                import re
-                match = re.search(r'[\w_]+$', line_before_cursor)
-                if match:
-                    word_before_cursor = match.group(0)
+                # Extract the last word before cursor (potential snippet trigger),
+                # which can only exist if the line ends with a word character
+                if line_before_cursor and (line_before_cursor[-1].isalnum() or line_before_cursor[-1] == '_'):
+                    match = _TRAILING_WORD_RE.search(line_before_cursor)
+                    if match:
+                        word_before_cursor = match.group(0)
                 
                 # If we have a word that could be a snippet prefix
                 if word_before_cursor:
-                    # Get standard snippets
-                    import snippets
-                    snippet_manager = snippets.get_snippet_manager()
-                    matching_snippets = snippet_manager.get_matching_snippets(language, word_before_cursor)
-                    
-                    # Get AI-generated snippets
-                    import ai_snippets
-                    ai_snippet_generator = ai_snippets.get_ai_snippet_generator()
-                    ai_matching_snippets = ai_snippet_generator.get_matching_snippets(language, word_before_cursor)
-                    
-                    # Add AI snippets to completions if any match
-                    if ai_matching_snippets:
-                        # Prepend AI-generated snippets to show them first
-                        matching_snippets = ai_matching_snippets + matching_snippets
-                    
-                    # Add snippets to completions
-                    if matching_snippets:
-                        # Include AI snippets in completions
-                        for snippet in matching_snippets:
-                            # Add snippet objects directly
-                            completions.append(snippet)
+                    # Add snippet objects directly, AI-generated snippets
+                    # first so they are shown first
+                    completions.extend(_matching_ai_snippets(language, word_before_cursor))
+                    completions.extend(_matching_snippets(language, word_before_cursor))
         
         # Set completion state
         self.completion.completions = completions
@@ -462,7 +543,6 @@ class EditorState:
         self.completion.trigger_position = position[1]  # Column where triggered
         
         # Animate appearance
-        import micro_animations
         self.completion.opacity = 0.0  # Start invisible
         self.completion.scale = 0.95   # Start slightly smaller
         self.completion.visible = True
@@ -470,7 +550,7 @@ class EditorState:
         self.completion.animation_direction = "in"
         
         # Start animation
-        micro_animations.get_micro_animations().animate_code_completion_popup(
+        _get_micro_animations().animate_code_completion_popup(
             self.completion, appearing=True
         )
         
@@ -480,12 +560,11 @@ class EditorState:
             return
             
         # Animate disappearance
-        import micro_animations
         self.completion.animating = True
         self.completion.animation_direction = "out"
         
         # Start animation
-        micro_animations.get_micro_animations().animate_code_completion_popup(
+        _get_micro_animations().animate_code_completion_popup(
             self.completion, appearing=False
         )
         
@@ -494,35 +573,39 @@ class EditorState:
         
     def select_next_completion(self):
         """Select the next completion in the list"""
-        if not self.completion.visible or not self.completion.completions:
+        comp = self.completion
+        completions = comp.completions
+        if not comp.visible or not completions:
             return
             
         # Move to next item, wrapping around
-        self.completion.current_index = (self.completion.current_index + 1) % len(self.completion.completions)
+        comp.current_index = (comp.current_index + 1) % len(completions)
         
         # Animate selection
-        import micro_animations
-        micro_animations.get_micro_animations().animate_completion_selection(self.completion)
+        _get_micro_animations().animate_completion_selection(comp)
         
     def select_prev_completion(self):
         """Select the previous completion in the list"""
-        if not self.completion.visible or not self.completion.completions:
+        comp = self.completion
+        completions = comp.completions
+        if not comp.visible or not completions:
             return
             
         # Move to previous item, wrapping around
-        self.completion.current_index = (self.completion.current_index - 1) % len(self.completion.completions)
+        comp.current_index = (comp.current_index - 1) % len(completions)
         
         # Animate selection
-        import micro_animations
-        micro_animations.get_micro_animations().animate_completion_selection(self.completion)
+        _get_micro_animations().animate_completion_selection(comp)
         
     def accept_selected_completion(self):
         """Accept the currently selected completion"""
-        if not self.completion.visible or not self.completion.completions:
+        comp = self.completion
+        completions = comp.completions
+        if not comp.visible or not completions:
             return None
             
         # Get the selected completion
-        selected = self.completion.completions[self.completion.current_index]
+        selected = completions[comp.current_index]
         
         # Check if the selected completion is a snippet
         active_tab = self.get_active_tab()
@@ -548,17 +631,18 @@ class EditorState:
                     # Get the snippet expanded text and placeholder positions
                     insertion_text, placeholder_positions = selected.get_insertion_text()
                     
-                    # Replace the trigger text with the expanded snippet
-                    new_text = text[:trigger_pos] + insertion_text + text[cursor_position:]
-                    buffer.text = new_text
+                    # Replace the trigger text with the expanded snippet, editing
+                    # the buffer in place rather than rebuilding the whole text
+                    buffer.delete_before_cursor(len(trigger_text))
+                    buffer.insert_text(insertion_text)
                     
                     # Set new cursor position to the first placeholder or end of insertion
                     if placeholder_positions:
                         # Store placeholder information for navigation
-                        self.completion.is_snippet = True
-                        self.completion.active_snippet = selected
-                        self.completion.snippet_placeholders = placeholder_positions
-                        self.completion.current_placeholder = 0
+                        comp.is_snippet = True
+                        comp.active_snippet = selected
+                        comp.snippet_placeholders = placeholder_positions
+                        comp.current_placeholder = 0
                         
                         # Move cursor to the first placeholder
                         first_placeholder = placeholder_positions[0]
@@ -593,37 +677,37 @@ class EditorState:
             
     def navigate_next_snippet_placeholder(self):
         """Navigate to the next placeholder in the active snippet"""
-        if not self.completion.is_snippet or not self.completion.snippet_placeholders:
+        comp = self.completion
+        placeholders = comp.snippet_placeholders
+        if not comp.is_snippet or not placeholders:
             return False
             
         active_tab = self.get_active_tab()
-        if not active_tab or not active_tab.buffer:
+        buffer = active_tab.buffer if active_tab else None
+        if not buffer:
             return False
             
         # If we're at the last placeholder, cancel snippet mode
-        if self.completion.current_placeholder >= len(self.completion.snippet_placeholders) - 1:
-            self.completion.is_snippet = False
-            self.completion.active_snippet = None
-            self.completion.snippet_placeholders = []
-            self.completion.current_placeholder = 0
+        index = comp.current_placeholder
+        count = len(placeholders)
+        if index >= count - 1:
+            comp.is_snippet = False
+            comp.active_snippet = None
+            comp.snippet_placeholders = []
+            comp.current_placeholder = 0
             
             # Remove selection and show status message
-            active_tab.buffer.selection_state = None
+            buffer.selection_state = None
             self.status_message = "Snippet editing completed."
             self.status_type = "info"
             return True
             
         # Move to the next placeholder
-        self.completion.current_placeholder += 1
-        
-        # Get the new placeholder position
-        buffer = active_tab.buffer
-        document = buffer.document
-        text = document.text
+        index += 1
+        comp.current_placeholder = index
         
         # Get the placeholder start and end positions
-        placeholder = self.completion.snippet_placeholders[self.completion.current_placeholder]
-        placeholder_start, placeholder_end, placeholder_text = placeholder
+        placeholder_start, placeholder_end, placeholder_text = placeholders[index]
         
         # Move cursor to the placeholder start and select the text
         buffer.cursor_position = placeholder_start
@@ -633,37 +717,36 @@ class EditorState:
         )
         
         # Show status message
-        self.status_message = f"Placeholder {self.completion.current_placeholder+1}/{len(self.completion.snippet_placeholders)}"
+        self.status_message = f"Placeholder {index+1}/{len(placeholders)}"
         self.status_type = "info"
         
         return True
         
     def navigate_prev_snippet_placeholder(self):
         """Navigate to the previous placeholder in the active snippet"""
-        if not self.completion.is_snippet or not self.completion.snippet_placeholders:
+        comp = self.completion
+        placeholders = comp.snippet_placeholders
+        if not comp.is_snippet or not placeholders:
             return False
             
         active_tab = self.get_active_tab()
-        if not active_tab or not active_tab.buffer:
+        buffer = active_tab.buffer if active_tab else None
+        if not buffer:
             return False
             
         # If we're at the first placeholder, stay there
-        if self.completion.current_placeholder <= 0:
+        index = comp.current_placeholder
+        if index <= 0:
             self.status_message = "Already at first placeholder."
             self.status_type = "info"
             return True
             
         # Move to the previous placeholder
-        self.completion.current_placeholder -= 1
-        
-        # Get the new placeholder position
-        buffer = active_tab.buffer
-        document = buffer.document
-        text = document.text
+        index -= 1
+        comp.current_placeholder = index
         
         # Get the placeholder start and end positions
-        placeholder = self.completion.snippet_placeholders[self.completion.current_placeholder]
-        placeholder_start, placeholder_end, placeholder_text = placeholder
+        placeholder_start, placeholder_end, placeholder_text = placeholders[index]
         
         # Move cursor to the placeholder start and select the text
         buffer.cursor_position = placeholder_start
@@ -673,7 +756,7 @@ class EditorState:
         )
         
         # Show status message
-        self.status_message = f"Placeholder {self.completion.current_placeholder+1}/{len(self.completion.snippet_placeholders)}"
+        self.status_message = f"Placeholder {index+1}/{len(placeholders)}"
         self.status_type = "info"
         
         return True
@@ -701,25 +784,6 @@ class EditorState:
             
             # Apply theme transition animation if animations are enabled
             if self.enable_animations:
-                # Create a property to track theme transition
-                if not hasattr(self, 'theme_transition_progress'):
-                    self.theme_transition_progress = 0.0
-                
-                # Define the theme transition animation
-                class ThemeTransitionAnimation(animations.AnimationState):
-                    def __init__(self, target, old_theme, new_theme):
-                        super().__init__()
-                        self.target = target
-                        self.old_theme = old_theme
-                        self.new_theme = new_theme
-                        self.duration = 0.4  # Medium duration for smooth transition
-                        
-                    def on_frame(self):
-                        # Update transition progress
-                        progress = self.get_eased_progress("ease_out_cubic")
-                        self.target.theme_transition_progress = progress
-                        refresh_editor_view()
-                
                 # Start the transition animation
                 transition = ThemeTransitionAnimation(self, old_theme, theme_name)
                 animations.animation_manager.add_animation("theme_transition", transition)
@@ -785,15 +849,13 @@ class EditorState:
                 
                 # Apply micro-animation for unfolding if enabled
                 if self.enable_animations:
-                    import micro_animations
-                    
                     # Create an animation target object for this fold
                     fold_id = f"fold_{active_tab.filename}_{start_line}"
                     if fold_id not in self.button_states:
-                        self.button_states[fold_id] = type('FoldState', (), {'highlight': 0.0})
+                        self.button_states[fold_id] = _ToggleState()
                         
                     # Micro-animation for unfolding (brief flash)
-                    micro_animations.get_micro_animations().animate_button_press(
+                    _get_micro_animations().animate_button_press(
                         self.button_states[fold_id]
                     )
                 
@@ -806,26 +868,12 @@ class EditorState:
         
         # Apply micro-animation for folding if enabled
         if self.enable_animations:
-            import micro_animations
-            
             # Create an animation target object for this fold
             fold_id = f"fold_{active_tab.filename}_{start_line}"
             if fold_id not in self.button_states:
-                self.button_states[fold_id] = type('FoldState', (), {'highlight': 0.0})
+                self.button_states[fold_id] = _ToggleState()
                 
             # Use a slightly different animation for folding vs unfolding
-            class FoldAnimation(animations.AnimationState):
-                def __init__(self, target):
-                    super().__init__()
-                    self.target = target
-                    self.duration = 0.3
-                    
-                def on_frame(self):
-                    progress = self.get_eased_progress("ease_out_quad")
-                    self.target.highlight = progress
-                    refresh_editor_view()
-            
-            # Start the fold animation
             fold_anim = FoldAnimation(self.button_states[fold_id])
             animations.animation_manager.add_animation(fold_id, fold_anim)
             animations.animation_manager.start_animation(fold_id)
@@ -872,74 +920,41 @@ class EditorState:
         # Toggle the state
         self.show_search_ui = not self.show_search_ui
         
-        # Import micro_animations here to avoid circular imports
+        # Animate the toggle effect
+        self._run_toggle_animation("search_panel", self.show_search_ui)
+        
         if self.enable_animations:
-            import micro_animations
-            
-            # Create a toggle state object if it doesn't exist
-            toggle_id = "search_panel"
-            if toggle_id not in self.toggle_states:
-                self.toggle_states[toggle_id] = type('ToggleState', (), {'highlight': 0.0})
-                
-            # Animate the toggle effect
-            micro_animations.get_micro_animations().animate_toggle(
-                self.toggle_states[toggle_id], 
-                self.show_search_ui
-            )
-            
             # Animate panel appearance/disappearance
             if self.show_search_ui:
                 # Start at 0 and animate to 1
                 self.search_panel_opacity = 0.0
                 
-                # Create and start a fade-in animation
-                class PanelFadeIn(animations.AnimationState):
-                    def __init__(self, target):
-                        super().__init__()
-                        self.target = target
-                        self.duration = 0.2  # Quick animation
-                        
-                    def on_frame(self):
-                        progress = self.get_eased_progress("ease_out_cubic")
-                        self.target.search_panel_opacity = progress
-                        refresh_editor_view()
-                
-                fade_in = PanelFadeIn(self)
+                # Create and start a quick fade-in animation
+                fade_in = PanelFadeIn(self, "search_panel_opacity", 0.2)
                 animations.animation_manager.add_animation("search_panel_fade", fade_in)
                 animations.animation_manager.start_animation("search_panel_fade")
             else:
                 # Fade out animation
                 self.search_panel_opacity = 1.0
                 
-                class PanelFadeOut(animations.AnimationState):
-                    def __init__(self, target):
-                        super().__init__()
-                        self.target = target
-                        self.duration = 0.15  # Faster fade out
-                        
-                    def on_frame(self):
-                        progress = self.get_eased_progress("ease_in_cubic")
-                        self.target.search_panel_opacity = 1.0 - progress
-                        refresh_editor_view()
-                    
-                    def on_complete(self):
-                        # Clear search state when hiding search UI and animation is finished
-                        self.target.search_query = ""
-                        self.target.search_results = []
-                        self.target.current_search_index = 0
-                
-                fade_out = PanelFadeOut(self)
+                # Faster fade out, clearing the search state once it's finished
+                fade_out = PanelFadeOut(self, "search_panel_opacity", 0.15,
+                                        on_finished=self._clear_search)
                 animations.animation_manager.add_animation("search_panel_fade_out", fade_out)
                 animations.animation_manager.start_animation("search_panel_fade_out")
         else:
             # No animations - clear search state immediately when hiding
             if not self.show_search_ui:
-                self.search_query = ""
-                self.search_results = []
-                self.current_search_index = 0
+                self._clear_search()
                 
         return self.show_search_ui
         
+    def _clear_search(self):
+        """Clear the search state, e.g. when the search UI is hidden"""
+        self.search_query = ""
+        self.search_results = []
+        self.current_search_index = 0
+        
     def perform_search(self, query, case_sensitive=False):
         """Perform a search in the current buffer"""
         active_tab = self.get_active_tab()
@@ -1022,36 +1037,29 @@ class EditorState:
             prev_index: The previous search result index
             new_index: The new search result index
         """
-        import micro_animations
+        micro_animations = _get_micro_animations()
         
-        # Create animation target objects if they don't exist
-        if not hasattr(self, 'search_result_states'):
-            self.search_result_states = {}
-            
         # Create or update state objects for all results
         for i, (start, end) in enumerate(self.search_results):
             result_id = f"search_result_{i}"
             if result_id not in self.search_result_states:
-                self.search_result_states[result_id] = type('SearchResultState', (), {
-                    'highlight_intensity': 0.5,
-                    'scale': 1.0
-                })
+                self.search_result_states[result_id] = _SearchResultState()
                 
             # Animate the current and previous results
             if i == new_index:
                 # Current result - apply a navigation animation
-                micro_animations.get_micro_animations().animate_search_navigation(
+                micro_animations.animate_search_navigation(
                     self.search_result_states[result_id]
                 )
             elif i == prev_index:
                 # Previous result - remove its current status
-                micro_animations.get_micro_animations().animate_search_result(
+                micro_animations.animate_search_result(
                     self.search_result_states[result_id],
                     is_current=False
                 )
             elif i not in (prev_index, new_index):
                 # Other results - make sure they have the basic animation
-                micro_animations.get_micro_animations().animate_search_result(
+                micro_animations.animate_search_result(
                     self.search_result_states[result_id],
                     is_current=False
                 )
@@ -1430,6 +1438,65 @@ class TabTransitionAnimation(animations.AnimationState):
         if editor_app:
             editor_app.invalidate()
 
+class PanelFadeIn(animations.AnimationState):
+    """Fades a panel in by animating an opacity attribute from 0 to 1"""
+    def __init__(self, target, opacity_attribute, duration):
+        super().__init__()
+        self.target = target
+        self.opacity_attribute = opacity_attribute
+        self.duration = duration
+        
+    def on_frame(self):
+        progress = self.get_eased_progress("ease_out_cubic")
+        setattr(self.target, self.opacity_attribute, progress)
+        refresh_editor_view()
+
+class PanelFadeOut(animations.AnimationState):
+    """Fades a panel out by animating an opacity attribute from 1 to 0"""
+    def __init__(self, target, opacity_attribute, duration, on_finished=None):
+        super().__init__()
+        self.target = target
+        self.opacity_attribute = opacity_attribute
+        self.duration = duration
+        self.on_finished = on_finished
+        
+    def on_frame(self):
+        progress = self.get_eased_progress("ease_in_cubic")
+        setattr(self.target, self.opacity_attribute, 1.0 - progress)
+        refresh_editor_view()
+    
+    def on_complete(self):
+        super().on_complete()
+        if self.on_finished:
+            self.on_finished()
+
+class ThemeTransitionAnimation(animations.AnimationState):
+    """Animates the editor's theme transition progress after a theme change"""
+    def __init__(self, target, old_theme, new_theme):
+        super().__init__()
+        self.target = target
+        self.old_theme = old_theme
+        self.new_theme = new_theme
+        self.duration = 0.4  # Medium duration for smooth transition
+        
+    def on_frame(self):
+        # Update transition progress
+        progress = self.get_eased_progress("ease_out_cubic")
+        self.target.theme_transition_progress = progress
+        refresh_editor_view()
+
+class FoldAnimation(animations.AnimationState):
+    """Highlight animation of a block being folded"""
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self.duration = 0.3
+        
+    def on_frame(self):
+        progress = self.get_eased_progress("ease_out_quad")
+        self.target.highlight = progress
+        refresh_editor_view()
+
 def animate_tab_transition(from_index, to_index):
     """Start tab transition animation"""
     if from_index == to_index:
@@ -1628,10 +1695,7 @@ class SearchResultProcessor(Processor):
         current_pos = 0
         
         # Get animation states for styling
-        if hasattr(editor_state, 'search_result_states'):
-            search_states = editor_state.search_result_states
-        else:
-            search_states = {}
+        search_states = editor_state.search_result_states
         
         # Create fragments by splitting the line at each search result boundary
         for i, start, end in sorted(line_results, key=lambda x: x[1]):
@@ -9,7 +9,7 @@ from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.key_binding.key_processor import KeyPress, KeyProcessor
 from prompt_toolkit.keys import Keys
-from editor_core import editor_state, save_file, get_lexer_for_file
+from editor_core import editor_state, save_file, get_lexer_for_file, clear_snippet_cache
 from themes import get_available_themes, get_theme_style
 
 # Code completions including snippets
@@ -575,6 +575,7 @@ def create_key_bindings(terminal_manager):
             success = ai_snippet_generator.add_snippet(snippet)
             
             if success:
+                clear_snippet_cache()
                 editor_state.status_message = f"AI Snippet '{snippet.name}' created! Trigger with '{snippet.prefix}'"
                 editor_state.status_type = "info"
             else:
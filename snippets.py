@@ -138,6 +138,10 @@ class Snippet:
             placeholder_positions.append((start, start + length, display_text))
         
         return text, placeholder_positions
+    
+    def _key(self) -> Tuple:
+        """Get the fields that define the snippet's content"""
+        return (self.name, self.prefix, tuple(self.body), self.description, self.language)
 
 class SnippetManager:
     """Manages code snippets for the editor"""
@@ -4,6 +4,7 @@ Syntax Checker - Provides on-the-fly syntax checking for code in the editor
 """
 
 import ast
+import bisect
 import re
 import logging
 import importlib
@@ -139,6 +140,119 @@ def check_syntax(code, filename=None):
         logger.error(f"Error during syntax checking: {e}")
         return []
 
+def _top_level_block(statement_lines, line_count, start_line, end_line):
+    """Widen a range of changed lines to whole top-level statements
+    
+    The block runs from the top-level statement before the one containing
+    the first changed line to the end of the statement after the one
+    containing the last, so the blank lines around the change are checked
+    in context.
+    
+    Args:
+        statement_lines (list): Sorted first lines of the top-level statements
+        line_count (int): Number of lines of the code
+        start_line (int): First changed line (1-based)
+        end_line (int): Last changed line (1-based)
+        
+    Returns:
+        tuple: (first, last) lines of the block (1-based, inclusive)
+    """
+    containing = bisect.bisect_right(statement_lines, start_line) - 1
+    first = statement_lines[containing - 1] if containing >= 1 else 1
+    
+    following = bisect.bisect_right(statement_lines, end_line) + 1
+    last = statement_lines[following] - 1 if following < len(statement_lines) else line_count
+    
+    return first, last
+
+def check_python_style_range(code, tree, start_line, end_line, line_delta, previous_errors):
+    """Check the lines of Python code that changed since its last style check
+    
+    Only the top-level statements around the change are run through the
+    style checker; issues reported elsewhere are carried over from the
+    previous check, moved by the number of lines added or removed.
+    
+    Args:
+        code (str): The complete code
+        tree (ast.Module): The parsed code
+        start_line (int): First changed line (1-based)
+        end_line (int): Last changed line (1-based)
+        line_delta (int): Lines added (negative if removed) since the last check
+        previous_errors (list): Errors of the last check of the code
+        
+    Returns:
+        list: Style errors of the complete code
+    """
+    lines = code.splitlines(True)
+    statements = [(min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', ())]), node)
+                  for node in tree.body]
+    first, last = _top_level_block([line for line, _ in statements], len(lines), start_line, end_line)
+    
+    # Whether an import is at the top of the file depends on everything
+    # before it, so it can only be checked along with the whole file
+    if any(line >= first and isinstance(node, (ast.Import, ast.ImportFrom)) for line, node in statements):
+        return check_python_style(code)
+    
+    style_checker = pycodestyle.StyleGuide(quiet=True)
+    block_errors = style_checker.check_lines(lines[first - 1:last])
+    
+    errors = []
+    for line_number, offset, message, _ in block_errors:
+        if message.startswith("W391") and last < len(lines):
+            # Blank lines at the end of the block aren't the end of the file
+            continue
+        errors.append(SyntaxError(line_number + first - 1, offset, message, "style"))
+    
+    for error in previous_errors:
+        if error.line_number < first or (error.line_number == first and error.message.startswith("E30")):
+            # Lines before the block are unchanged, as are the blank lines
+            # before its first statement, which it can't be checked against
+            errors.append(error)
+        elif error.line_number + line_delta > last:
+            errors.append(SyntaxError(error.line_number + line_delta, error.column,
+                                      error.message, "style"))
+    
+    errors.sort(key=lambda error: error.line_number)
+    return errors
+
+def check_syntax_range(code, filename, start_line, end_line, line_delta, previous_errors):
+    """Check code syntax, only re-checking the style of lines that changed
+    
+    Syntax is always checked for the whole code, since a change anywhere can
+    affect how the rest parses.
+    
+    Args:
+        code (str): The complete code
+        filename (str): The filename to determine language
+        start_line (int): First changed line (1-based)
+        end_line (int): Last changed line (1-based)
+        line_delta (int): Lines added (negative if removed) since the last check
+        previous_errors (list): Errors of the last check of the code, or None
+        
+    Returns:
+        list: Errors of the complete code
+    """
+    # Errors of code that didn't parse can't be carried over
+    if (previous_errors is None or not code.strip()
+            or any(error.error_type == "syntax" for error in previous_errors)):
+        return check_syntax(code, filename)
+    
+    language = get_language_from_filename(filename)
+    if "python" not in language:
+        return check_syntax(code, filename)
+    
+    try:
+        tree = ast.parse(code)
+    except Exception:
+        # Code that doesn't parse can't be split into statements
+        return check_syntax(code, filename)
+    
+    try:
+        return check_python_style_range(code, tree, start_line, end_line, line_delta, previous_errors)
+    except Exception as e:
+        logger.error(f"Error during syntax checking: {e}")
+        return []
+
 def request_syntax_check(text, filename=None):
     """Request a syntax check for the given text and filename
     
@@ -150,8 +264,28 @@ def request_syntax_check(text, filename=None):
         None: Check is performed asynchronously
     """
     # Add to queue - will replace any previous request for the same file
-    _syntax_check_queue.put((text, filename))
+    _syntax_check_queue.put((text, filename, None))
+    _throttled_start_checker(filename)
+
+def request_syntax_check_range(text, filename, start_line, end_line, line_delta=0):
+    """Request a syntax check of a file that only changed in a range of lines
     
+    Args:
+        text (str): The complete code text to check
+        filename (str): The filename to determine language
+        start_line (int): First changed line (1-based)
+        end_line (int): Last changed line (1-based)
+        line_delta (int): Lines added (negative if removed) since the last
+            check requested for the file
+        
+    Returns:
+        None: Check is performed asynchronously
+    """
+    _syntax_check_queue.put((text, filename, (start_line, end_line, line_delta)))
+    _throttled_start_checker(filename)
+
+def _throttled_start_checker(filename):
+    """Start the background checker for a request, unless one was just made"""
     # Throttle to avoid too frequent checking for the same file
     current_time = time.time()
     if filename in _last_check_time and current_time - _last_check_time[filename] < 2.0:
@@ -213,10 +347,15 @@ def process_syntax_check_queue():
     while True:
         try:
             # Get the latest item from the queue (waiting up to 5 seconds)
-            text, filename = _syntax_check_queue.get(timeout=5)
+            text, filename, changed_lines = _syntax_check_queue.get(timeout=5)
             
             # Perform the syntax check
-            errors = check_syntax(text, filename)
+            if changed_lines is None:
+                errors = check_syntax(text, filename)
+            else:
+                with _syntax_check_lock:
+                    previous_errors = _syntax_check_results.get(filename)
+                errors = check_syntax_range(text, filename, *changed_lines, previous_errors)
             
             # Store the results
             with _syntax_check_lock:
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+from auto_indent import should_increase_indent
+
+def test_c_block_start():
+    """Lines opening more braces than they close start a block."""
+    assert should_increase_indent("int main() {", "c")
+    assert should_increase_indent("if (x) {", "javascript")
+    assert not should_increase_indent("int x = 1;", "c")
+
+def test_c_braces_in_comments():
+    """Braces in a trailing // comment don't start a block."""
+    assert not should_increase_indent("x = 1; // {", "c")
+    assert should_increase_indent("int f() { // }", "c")
+
+def test_c_braces_in_strings():
+    """Braces and // inside string literals are not code."""
+    assert should_increase_indent('fetch("http://x.com").then((r) => {', "javascript")
+    assert not should_increase_indent('var s = "{";', "javascript")
+    assert not should_increase_indent("char c = '{';", "c")
+    assert should_increase_indent('s = "a\\"{" + f({', "javascript")
+
+if __name__ == "__main__":
+    test_c_block_start()
+    test_c_braces_in_comments()
+    test_c_braces_in_strings()
+    print("All auto-indent tests passed")
@@ -3,9 +3,16 @@ Utility functions for the text editor
 """
 
 import os
+import json
 import platform
 import shutil
 
+try:
+    # orjson is optional; it parses and serializes JSON considerably faster
+    import orjson
+except ImportError:
+    orjson = None
+
 def get_available_shells():
     """Get a list of available shells on the current system"""
     available_shells = []
@@ -50,3 +57,15 @@ def get_file_extension(filename):
     
     _, ext = os.path.splitext(filename)
     return ext.lower()
+
+def json_to_bytes(data):
+    """Serialize data to indented JSON as UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+def json_from_bytes(data):
+    """Parse JSON from bytes (raises json.JSONDecodeError on invalid input)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)